@@ -0,0 +1,90 @@
+# benchmarks/api_falsa.py
+"""API de Telegram falsa en 127.0.0.1 para las pruebas locales (sin internet).
+
+Responde getMe, getUpdates (long polling sobre una cola), sendMessage y demás métodos con ok=True.
+Registra cada envío con su hora, puede simular la latencia de red y devolver 429 (RetryAfter).
+Uso: api = ApiFalsa(); api.iniciar(); ApplicationBuilder().token(...).base_url(api.base_url) …; api.detener()
+"""
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+class ApiFalsa:
+    def __init__(self, latencia: float = 0.0):
+        self.latencia = latencia     # segundos que tarda cada respuesta (simula la red)
+        self.pendientes = queue.Queue()  # updates que devolverá getUpdates
+        self.enviados = []           # [(perf_counter, método, chat_id)] de los envíos aceptados
+        self.rechazar = {}           # chat_id -> cuántos 429 devolver antes de aceptar
+        self.retry_after = 1
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._servidor.server_port}/bot"
+
+    def iniciar(self):
+        api = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                metodo = self.path.rsplit("/", 1)[-1]
+                cuerpo = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    params = json.loads(cuerpo or "{}")
+                else:
+                    params = {k: v[0] for k, v in parse_qs(cuerpo).items()}
+                self._responder(*api._atender(metodo, params))
+
+            def _responder(self, estado, datos):
+                datos = json.dumps(datos).encode()
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _atender(self, metodo, params):
+        if metodo == "getUpdates":
+            resultado = []
+            try:
+                resultado.append(self.pendientes.get(timeout=float(params.get("timeout", 0)) or 0.01))
+                while True:
+                    resultado.append(self.pendientes.get_nowait())
+            except queue.Empty:
+                pass
+            return 200, {"ok": True, "result": resultado}
+
+        if self.latencia:
+            time.sleep(self.latencia)
+        if metodo == "getMe":
+            return 200, {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "Kamada",
+                                                "username": "kamada_bot"}}
+        if metodo in ("sendMessage", "sendPhoto", "sendDocument", "editMessageText"):
+            chat_id = int(params["chat_id"])
+            with self._lock:
+                if self.rechazar.get(chat_id):
+                    self.rechazar[chat_id] -= 1
+                    return 429, {"ok": False, "error_code": 429,
+                                 "description": f"Too Many Requests: retry after {self.retry_after}",
+                                 "parameters": {"retry_after": self.retry_after}}
+                self.enviados.append((time.perf_counter(), metodo, chat_id))
+                n = len(self.enviados)
+            return 200, {"ok": True, "result": {
+                "message_id": n, "date": int(time.time()), "text": params.get("text", ""),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"}}}
+        return 200, {"ok": True, "result": True}  # setWebhook, deleteWebhook, …
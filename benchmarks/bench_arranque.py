@@ -0,0 +1,65 @@
+# benchmarks/bench_arranque.py
+"""Tiempo de arranque en frío de main.py y desglose de importaciones con -X importtime.
+
+Importa main en procesos nuevos (sin conectar con Telegram) y muestra la mediana y los módulos
+que más tardan. Sale con código 1 si el arranque supera --max-ms o si al importar main se cargan
+dependencias pesadas que deberían diferirse hasta el primer reporte o importación.
+
+Uso: python benchmarks/bench_arranque.py [--repeticiones 5] [--top 15] [--max-ms 1000]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PESADOS = ("pandas", "numpy", "matplotlib", "openpyxl")
+
+def _python(*args):
+    return subprocess.run([sys.executable, *args], cwd=RAIZ, capture_output=True, text=True, check=True)
+
+def medir_arranque(repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        _python("-c", "import main")
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2]
+
+def desglose(top):
+    """Devuelve [(acumulado_us, propio_us, módulo)] de -X importtime, de mayor a menor acumulado."""
+    filas = []
+    for linea in _python("-X", "importtime", "-c", "import main").stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, modulo = linea[len("import time:"):].split("|")
+        filas.append((int(acumulado), int(propio), modulo.rstrip()))
+    filas.sort(reverse=True)
+    return filas[:top]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    mediana = medir_arranque(args.repeticiones)
+    print(f"Arranque (python -c 'import main'): mediana {mediana:.0f} ms en {args.repeticiones} corridas\n")
+    print(f"{'acumulado':>10} {'propio':>8}  módulo")
+    for acumulado, propio, modulo in desglose(args.top):
+        print(f"{acumulado / 1000:>8.1f}ms {propio / 1000:>6.1f}ms  {modulo}")
+
+    cargados = _python("-c", "import sys, main; print(' '.join(sys.modules))").stdout.split()
+    pesados = [m for m in PESADOS if m in cargados]
+    if pesados:
+        print(f"\nFALLO: importar main carga {', '.join(pesados)}")
+    if mediana > args.max_ms:
+        print(f"\nFALLO: el arranque tarda más de {args.max_ms:.0f} ms")
+    if pesados or mediana > args.max_ms:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
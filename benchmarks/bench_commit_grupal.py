@@ -0,0 +1,67 @@
+# benchmarks/bench_commit_grupal.py
+"""Inserciones por segundo con muchos supervisores confirmando cargas a la vez.
+
+Cada supervisor simulado confirma --cargas cargas de --ids trabajadores, una detrás de otra (espera
+el "✅ Registro guardado." antes de la siguiente). Se compara una transacción por confirmación con el
+commit agrupado de db_async, e informa filas por segundo y la espera de cada confirmación.
+
+database.py usa synchronous=FULL (fsync en cada commit); --synchronous NORMAL mide sin ese fsync.
+
+Uso: python benchmarks/bench_commit_grupal.py [--supervisores 200] [--cargas 20] [--ids 8] [--synchronous FULL]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+import db_async
+
+async def _por_transaccion(area, cargas, responsable_id):
+    return await db_async.escribir(database.agregar_cargas, area, cargas, responsable_id)
+
+async def _supervisor(s, confirmar, cargas, ids, esperas):
+    for c in range(cargas):
+        trabajadores = [(s * 7 + c * ids + i) % 500 + 1 for i in range(ids)]
+        t0 = time.perf_counter()
+        await confirmar("Línea", [("2025-10-14", "Kamada", "Tomate", trabajadores, 2.0)], s)
+        esperas.append(time.perf_counter() - t0)
+
+async def simular(confirmar, supervisores, cargas, ids):
+    esperas = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_supervisor(s, confirmar, cargas, ids, esperas) for s in range(supervisores)))
+    return time.perf_counter() - t0, esperas
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--supervisores", type=int, default=200)
+    parser.add_argument("--cargas", type=int, default=20, help="confirmaciones por supervisor")
+    parser.add_argument("--ids", type=int, default=8, help="trabajadores por carga")
+    parser.add_argument("--synchronous", default="FULL", choices=("NORMAL", "FULL"))
+    args = parser.parse_args()
+
+    filas = args.supervisores * args.cargas * args.ids
+    with tempfile.TemporaryDirectory() as tmp:
+        for nombre, confirmar in (("una transacción por carga", _por_transaccion),
+                                  ("commit agrupado", db_async.agregar_cargas)):
+            database.DB_NAME = os.path.join(tmp, f"grupal_{len(nombre)}.db")
+            database.init_db()
+            with database._escritura() as cur:
+                cur.execute(f"PRAGMA synchronous={args.synchronous}")
+            duracion, esperas = asyncio.run(simular(confirmar, args.supervisores, args.cargas, args.ids))
+            with database._lectura() as cur:
+                guardadas = cur.execute("SELECT COUNT(*) FROM produccion").fetchone()[0]
+            assert guardadas == filas, f"se esperaban {filas} filas y hay {guardadas}"
+            esperas.sort()
+            p = lambda q: esperas[min(len(esperas) - 1, int(q * len(esperas)))] * 1000
+            print(f"{nombre:<27} {filas / duracion:>9.0f} filas/s   espera p50 {p(0.5):>7.1f} ms   "
+                  f"p99 {p(0.99):>7.1f} ms")
+            db_async.cerrar()
+            database.cerrar_conexiones()
+
+if __name__ == "__main__":
+    main()
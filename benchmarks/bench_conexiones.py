@@ -0,0 +1,73 @@
+# benchmarks/bench_conexiones.py
+"""Compara el pool persistente de database.py contra abrir una conexión por llamada.
+
+Uso: python benchmarks/bench_conexiones.py [--n 2000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+
+def insertar_por_llamada(db_name, n):
+    """Reproduce el comportamiento anterior: connect + commit + close en cada registro."""
+    for i in range(n):
+        conn = sqlite3.connect(db_name)
+        cur = conn.cursor()
+        # area_id y empresa_id fijos: aquí sólo importa el costo de abrir la conexión y del commit
+        cur.execute("""
+            INSERT INTO produccion (fecha, area_id, empresa_id, cantidad_centesimas, trabajador_id, responsable_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, ("2025-10-14", 1, 1, 1000, i % 50 + 1, 1))
+        conn.commit()
+        conn.close()
+
+def leer_por_llamada(db_name, n):
+    for _ in range(n):
+        conn = sqlite3.connect(db_name)
+        conn.execute("SELECT COUNT(*) FROM produccion WHERE fecha = ?", ("2025-10-14",)).fetchall()
+        conn.close()
+
+def insertar_con_pool(n):
+    for i in range(n):
+        database.agregar_registro(i % 50 + 1, "Mesa", "Kamada", 10, 1, fecha="2025-10-14")
+
+def leer_con_pool(n):
+    for _ in range(n):
+        with database._lectura() as cur:
+            cur.execute("SELECT COUNT(*) FROM produccion WHERE fecha = ?", ("2025-10-14",)).fetchall()
+
+def medir(nombre, fn, n):
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    print(f"{nombre:<32} {n / dt:>10.0f} ops/s   {dt * 1e6 / n:>8.1f} µs/op")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Base con journal por defecto (rollback journal), como antes del cambio
+        antigua = os.path.join(tmp, "por_llamada.db")
+        database.DB_NAME = antigua
+        database.init_db()
+        database.cerrar_conexiones()
+        sqlite3.connect(antigua).execute("PRAGMA journal_mode=DELETE").close()
+
+        medir("insert: connect por llamada", lambda: insertar_por_llamada(antigua, args.n), args.n)
+        medir("select: connect por llamada", lambda: leer_por_llamada(antigua, args.n), args.n)
+
+        database.DB_NAME = os.path.join(tmp, "pool.db")
+        database.init_db()
+        medir("insert: pool WAL", lambda: insertar_con_pool(args.n), args.n)
+        medir("select: pool WAL", lambda: leer_con_pool(args.n), args.n)
+        database.cerrar_conexiones()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# benchmarks/bench_etiquetas.py
+"""Tamaño de la base y tiempo de los reportes: etiquetas como texto en cada fila contra ids (diccionarios).
+
+Genera los mismos registros en dos bases:
+- texto: el esquema anterior (versión 1), con area, empresa y tipo como texto en produccion y en
+  produccion_diaria, y el índice (fecha, area, empresa);
+- ids: el esquema actual de database.py (areas, empresas, tipos y proveedores como tablas de etiquetas).
+Ambas se compactan con VACUUM antes de medir. Las consultas de la base con texto son las que usaban
+los reportes con ese esquema; las de la base con ids son las funciones actuales de database.py.
+
+Uso: python benchmarks/bench_etiquetas.py [--filas 1000000] [--dias 730] [--trabajadores 3000]
+         [--proveedores 40] [--repeticiones 5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from bench_indices import generar_filas
+
+INICIO = date(2024, 1, 1)
+
+_ESQUEMA_TEXTO = (
+    "CREATE TABLE trabajadores (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL)",
+    """CREATE TABLE produccion (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, fecha TEXT NOT NULL, area TEXT NOT NULL, empresa TEXT NOT NULL,
+        tipo TEXT, cantidad_centesimas INTEGER NOT NULL, cantidad_auxiliar INTEGER, trabajador_id INTEGER,
+        responsable_id INTEGER)""",
+    """CREATE TABLE produccion_diaria (
+        fecha TEXT NOT NULL, area TEXT NOT NULL, empresa TEXT NOT NULL, tipo TEXT NOT NULL DEFAULT '',
+        trabajador_id INTEGER NOT NULL DEFAULT 0, cantidad_centesimas INTEGER NOT NULL,
+        registros INTEGER NOT NULL, PRIMARY KEY (fecha, area, empresa, tipo, trabajador_id)) WITHOUT ROWID""",
+)
+_INDICES_TEXTO = (
+    "CREATE INDEX idx_produccion_fecha_area_empresa ON produccion (fecha, area, empresa)",
+    "CREATE INDEX idx_produccion_trabajador ON produccion (trabajador_id)",
+)
+_CANTIDAD = database._SQL_CANTIDAD
+_SQL_TEXTO = {
+    "registros_por_fecha": f"""
+        SELECT p.fecha, p.area, p.empresa, p.tipo, {_CANTIDAD}, p.trabajador_id, t.nombre
+        FROM produccion p LEFT JOIN trabajadores t ON p.trabajador_id = t.id
+        WHERE p.fecha = ? AND (? IS NULL OR p.empresa = ?) ORDER BY p.area, p.empresa""",
+    "registros_periodo(31d)": f"""
+        SELECT p.fecha, p.area, p.empresa, p.tipo, {_CANTIDAD}, p.trabajador_id, t.nombre
+        FROM produccion p LEFT JOIN trabajadores t ON p.trabajador_id = t.id
+        WHERE p.fecha BETWEEN ? AND ? AND (? IS NULL OR p.empresa = ?) ORDER BY p.fecha, p.area, p.empresa""",
+    "totales_por_area": """
+        SELECT area, empresa, tipo, SUM(cantidad_centesimas), SUM(registros) FROM produccion_diaria
+        WHERE fecha BETWEEN ? AND ? AND (? IS NULL OR empresa = ?)
+        GROUP BY area, empresa, tipo ORDER BY area, empresa, tipo""",
+    "totales_trabajador": """
+        SELECT g.trabajador_id, t.nombre, g.area, g.cantidad, g.registros FROM (
+            SELECT trabajador_id, area, SUM(cantidad_centesimas) / 100.0 AS cantidad, SUM(registros) AS registros
+            FROM produccion_diaria WHERE fecha BETWEEN ? AND ? AND (? IS NULL OR empresa = ?)
+            GROUP BY area, trabajador_id) g
+        LEFT JOIN trabajadores t ON g.trabajador_id = t.id ORDER BY g.area, t.nombre, g.trabajador_id""",
+    "GROUP BY sobre produccion": """
+        SELECT area, empresa, tipo, SUM(cantidad_centesimas), COUNT(*) FROM produccion
+        GROUP BY area, empresa, tipo""",
+}
+_SQL_IDS_GROUP_BY = """
+    SELECT a.nombre, e.nombre, COALESCE(ti.nombre, pr.nombre), g.cantidad, g.registros FROM (
+        SELECT area_id, empresa_id, tipo_id, proveedor_id, SUM(cantidad_centesimas) AS cantidad,
+               COUNT(*) AS registros
+        FROM produccion GROUP BY area_id, empresa_id, tipo_id, proveedor_id) g
+    JOIN areas a ON a.id = g.area_id JOIN empresas e ON e.id = g.empresa_id
+    LEFT JOIN tipos ti ON ti.id = g.tipo_id LEFT JOIN proveedores pr ON pr.id = g.proveedor_id
+"""
+
+def filas(args):
+    """Las filas de bench_indices, con proveedor y cestas en Sardina (como las carga sardina.py)."""
+    rnd = random.Random(7)
+    for fecha, area, empresa, tipo, cantidad, tid, rid, aux in generar_filas(
+            args.filas, args.dias, args.trabajadores, INICIO):
+        if area == database.AREA_CON_PROVEEDOR:
+            tipo, aux = f"Proveedor {rnd.randrange(args.proveedores) + 1}", rnd.randint(1, 20)
+            cantidad = round(cantidad * 1.37, 2)
+        yield fecha, area, empresa, tipo, cantidad, tid, rid, aux
+
+def _compactar(ruta):
+    conn = database._conectar(ruta)
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return os.path.getsize(ruta)
+
+def crear_texto(ruta, args):
+    conn = database._conectar(ruta)
+    with conn:
+        for sql in _ESQUEMA_TEXTO + _INDICES_TEXTO:
+            conn.execute(sql)
+        conn.executemany("INSERT INTO trabajadores (id, nombre) VALUES (?, ?)",
+                         ((i, f"Trabajador {i}") for i in range(1, args.trabajadores + 1)))
+        conn.executemany("""
+            INSERT INTO produccion (fecha, area, empresa, tipo, cantidad_centesimas, trabajador_id,
+                                    responsable_id, cantidad_auxiliar)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, ((f, a, e, t, database.a_centesimas(c), tid, rid, aux) for f, a, e, t, c, tid, rid, aux in filas(args)))
+        conn.execute("""
+            INSERT INTO produccion_diaria
+            SELECT fecha, area, empresa, COALESCE(tipo, ''), COALESCE(trabajador_id, 0),
+                   SUM(cantidad_centesimas), COUNT(*)
+            FROM produccion GROUP BY fecha, area, empresa, COALESCE(tipo, ''), COALESCE(trabajador_id, 0)
+        """)
+    conn.close()
+    return _compactar(ruta)
+
+def crear_ids(ruta, args):
+    database.DB_NAME = ruta
+    database.init_db()
+    database.upsert_trabajadores_lote((i, f"Trabajador {i}") for i in range(1, args.trabajadores + 1))
+    database.insertar_registros(filas(args))
+    database.cerrar_conexiones()
+    return _compactar(ruta)
+
+def _mediana(fn, repeticiones):
+    fn()  # calienta la caché de páginas
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t0)
+    return sorted(tiempos)[len(tiempos) // 2]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--dias", type=int, default=730)
+    parser.add_argument("--trabajadores", type=int, default=3000)
+    parser.add_argument("--proveedores", type=int, default=40)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    dia = (INICIO + timedelta(days=args.dias // 2)).isoformat()
+    mes_fin = (INICIO + timedelta(days=args.dias // 2 + 30)).isoformat()
+    anio_ini, anio_fin = INICIO.isoformat(), (INICIO + timedelta(days=364)).isoformat()
+    consultas = [  # (nombre, parámetros, función con el esquema actual)
+        ("registros_por_fecha", (dia, None, None), lambda: database.obtener_registros_por_fecha(dia)),
+        ("registros_periodo(31d)", (dia, mes_fin, None, None),
+         lambda: database.obtener_registros_periodo(dia, mes_fin)),
+        ("totales_por_area", (anio_ini, anio_fin, None, None),
+         lambda: database.obtener_totales_por_area(anio_ini, anio_fin)),
+        ("totales_trabajador", (anio_ini, anio_fin, None, None),
+         lambda: database.obtener_totales_por_trabajador(anio_ini, anio_fin)),
+        ("GROUP BY sobre produccion", (), None),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        texto, ids = os.path.join(tmp, "texto.db"), os.path.join(tmp, "ids.db")
+        t0 = time.perf_counter()
+        tamano_texto = crear_texto(texto, args)
+        tamano_ids = crear_ids(ids, args)
+        print(f"{args.filas} filas, {args.dias} días, {args.trabajadores} trabajadores "
+              f"(bases generadas en {time.perf_counter() - t0:.1f} s)")
+        print(f"  {'tamaño de la base':<27} texto {tamano_texto / 2**20:>9.1f} MB   ids {tamano_ids / 2**20:>9.1f} MB"
+              f"   {1 - tamano_ids / tamano_texto:>6.1%} menos")
+
+        conn = database._conectar(texto, solo_lectura=True)
+        database.DB_NAME = ids
+        for nombre, params, fn in consultas:
+            t_texto = _mediana(lambda: conn.execute(_SQL_TEXTO[nombre], params).fetchall(), args.repeticiones)
+            if fn is None:
+                with database._lectura() as cur:
+                    t_ids = _mediana(lambda: cur.execute(_SQL_IDS_GROUP_BY).fetchall(), args.repeticiones)
+            else:
+                t_ids = _mediana(fn, args.repeticiones)
+            print(f"  {nombre:<27} texto {t_texto * 1e3:>9.1f} ms   ids {t_ids * 1e3:>9.1f} ms"
+                  f"   x{t_texto / t_ids:.2f}")
+        conn.close()
+        database.cerrar_conexiones()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_exportacion.py
+"""Tiempo y pico de memoria de la exportación de detalle (xlsx y csv.gz) a distintos volúmenes.
+
+Cada medición corre en un proceso nuevo, así el pico de memoria no arrastra el de la anterior.
+Se informa el pico de RSS y la memoria anónima (RssAnon) al terminar: el pico incluye las páginas de
+la base leídas por mmap, que son del archivo y no del proceso; la memoria anónima debería ser casi la
+misma para cualquier cantidad de filas. Sin lxml, openpyxl escribe más lento.
+
+Uso: python benchmarks/bench_exportacion.py [--filas 100000 1000000]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from bench_indices import poblar
+
+def medir(db, formato):
+    """Se ejecuta en el proceso hijo: exporta todo el rango e imprime tiempo, tamaño y pico de RSS."""
+    database.DB_NAME = db
+    from reportes import escribir_detalle
+    t0 = time.perf_counter()
+    ruta = escribir_detalle("2024-01-01", "2025-12-31", formato=formato)
+    dt = time.perf_counter() - t0
+    tamano = os.path.getsize(ruta) / 2**20
+    os.remove(ruta)
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB en Linux
+    with open("/proc/self/status") as f:
+        anonima = next(int(l.split()[1]) for l in f if l.startswith("RssAnon")) / 1024
+    print(f"{dt:.1f} {tamano:.1f} {pico:.0f} {anonima:.0f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--hijo", nargs=2, metavar=("DB", "FORMATO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.hijo:
+        medir(*args.hijo)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.filas:
+            database.DB_NAME = os.path.join(tmp, f"export_{n}.db")
+            database.init_db()
+            poblar(n, 730, 3000, date(2024, 1, 1))
+            database.cerrar_conexiones()
+            for formato in ("csv", "xlsx"):
+                salida = subprocess.run([sys.executable, __file__, "--hijo", database.DB_NAME, formato],
+                                        capture_output=True, text=True, check=True).stdout.split()
+                dt, tamano, pico, anonima = salida
+                print(f"{n:>9} filas  {formato:<4}  {float(dt):>7.1f} s  {float(tamano):>7.1f} MB  "
+                      f"pico RSS {pico:>5} MB  anónima {anonima:>5} MB")
+
+if __name__ == "__main__":
+    main()
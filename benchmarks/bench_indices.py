@@ -0,0 +1,99 @@
+# benchmarks/bench_indices.py
+"""Latencia de los reportes sobre una base sintética grande, antes y después de los índices.
+
+Uso: python benchmarks/bench_indices.py [--filas 2000000] [--db /tmp/bench.db]
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+
+AREAS = [("Sardina", None), ("Mesa", None), ("Línea", "Tomate"), ("Línea", "Aceite"),
+         ("Empaque", "Tomate"), ("Empaque", "Aceite")]
+EMPRESAS = ["Kamada", "Pariamar"]
+
+def generar_filas(n, dias, trabajadores, inicio):
+    rnd = random.Random(42)
+    for _ in range(n):
+        area, tipo = rnd.choice(AREAS)
+        fecha = (inicio + timedelta(days=rnd.randrange(dias))).isoformat()
+        yield (fecha, area, rnd.choice(EMPRESAS), tipo, rnd.randint(1, 50),
+               rnd.randint(1, trabajadores), 1, None)
+
+def poblar(n, dias, trabajadores, inicio):
+    with database._escritura() as cur:
+        cur.executemany("INSERT INTO trabajadores (id, nombre) VALUES (?, ?)",
+                        ((i, f"Trabajador {i}") for i in range(1, trabajadores + 1)))
+    filas = generar_filas(n, dias, trabajadores, inicio)
+    while bloque := list(itertools.islice(filas, 100_000)):
+        database.insertar_registros(bloque)
+
+def medir(nombre, fn, repeticiones=5):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        filas = fn()
+        tiempos.append(time.perf_counter() - t0)
+    tiempos.sort()
+    print(f"  {nombre:<22} {len(filas):>9} filas   mediana {tiempos[len(tiempos) // 2] * 1000:>9.1f} ms")
+
+def plan(sql, params):
+    # Conexión nueva: EXPLAIN no revalida el esquema en caché de las conexiones del pool
+    conn = sqlite3.connect(database.DB_NAME)
+    for fila in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+        print("    ", fila[-1])
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=2_000_000)
+    parser.add_argument("--dias", type=int, default=730)
+    parser.add_argument("--trabajadores", type=int, default=3000)
+    parser.add_argument("--db", default=None, help="ruta de la base sintética (por defecto, temporal)")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.db is None:
+        tmp = tempfile.TemporaryDirectory()
+        args.db = os.path.join(tmp.name, "bench.db")
+    database.DB_NAME = args.db
+
+    inicio = date(2024, 1, 1)
+    dia = (inicio + timedelta(days=args.dias // 2)).isoformat()
+    mes_ini, mes_fin = dia, (inicio + timedelta(days=args.dias // 2 + 30)).isoformat()
+
+    database.init_db()
+    with database._escritura() as cur:
+        cur.execute("DROP INDEX IF EXISTS idx_produccion_fecha_area_empresa")
+        cur.execute("DROP INDEX IF EXISTS idx_produccion_trabajador")
+    t0 = time.perf_counter()
+    poblar(args.filas, args.dias, args.trabajadores, inicio)
+    print(f"Base sintética: {args.filas} filas en {time.perf_counter() - t0:.1f} s ({args.db})")
+
+    def reportes(titulo):
+        print(titulo)
+        medir("por fecha (1 día)", lambda: database.obtener_registros_por_fecha(dia))
+        medir("periodo (31 días)", lambda: database.obtener_registros_periodo(mes_ini, mes_fin))
+        plan("SELECT * FROM produccion p LEFT JOIN trabajadores t ON p.trabajador_id = t.id "
+             "WHERE p.fecha BETWEEN ? AND ? ORDER BY p.fecha, p.area_id, p.empresa_id", (mes_ini, mes_fin))
+
+    reportes("Sin índices:")
+    t0 = time.perf_counter()
+    database.init_db()  # aplica la migración de índices
+    print(f"Migración de índices: {time.perf_counter() - t0:.1f} s")
+    reportes("Con índices:")
+
+    database.cerrar_conexiones()
+    if tmp is not None:
+        tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_metricas.py
+"""Costo de las métricas de metricas.py en el camino caliente.
+
+Mide, en µs por llamada: registrar una medición con observar(), y un handler async trivial sin
+instrumentar contra el mismo handler envuelto por metricas.instrumentar (lo que paga cada update).
+Con --desactivadas se repite con metricas.ACTIVAS = False.
+
+Uso: python benchmarks/bench_metricas.py [--llamadas 200000] [--desactivadas]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metricas
+
+async def _handler(update, context):
+    return None
+
+def _por_llamada(fn, llamadas):
+    t0 = time.perf_counter()
+    fn(llamadas)
+    return (time.perf_counter() - t0) / llamadas * 1e6
+
+def _observar(llamadas):
+    for i in range(llamadas):
+        metricas.observar("kamada_db_segundos", ("agregar_registro", "escritura"), (i % 1000) * 1e-5)
+
+def _handlers(callback):
+    async def correr(llamadas):
+        for _ in range(llamadas):
+            await callback(None, None)
+    return lambda llamadas: asyncio.run(correr(llamadas))
+
+def medir(llamadas):
+    medido = metricas._medido(_handler, metricas.histograma("kamada_handler_segundos", ("bench", "-")))
+    sin = _por_llamada(_handlers(_handler), llamadas)
+    con = _por_llamada(_handlers(medido), llamadas)
+    print(f"  observar()                 {_por_llamada(_observar, llamadas):>6.3f} µs/llamada")
+    print(f"  handler sin instrumentar   {sin:>6.3f} µs/llamada")
+    print(f"  handler instrumentado      {con:>6.3f} µs/llamada   (+{con - sin:.3f} µs)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llamadas", type=int, default=200_000)
+    parser.add_argument("--desactivadas", action="store_true", help="también con metricas.ACTIVAS = False")
+    args = parser.parse_args()
+
+    print("Métricas activas:")
+    medir(args.llamadas)
+    if args.desactivadas:
+        metricas.ACTIVAS = False
+        print("Métricas desactivadas:")
+        medir(args.llamadas)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/bench_persistencia.py
+"""Costo por mensaje de la persistencia de conversaciones (persistencia.py).
+
+Simula mensajes de varios usuarios a mitad de una carga y compara guardar en cada mensaje contra
+guardar por ciclos, como hace PTB cada update_interval segundos. Informa el costo total amortizado por
+mensaje y la parte que ocupa el event loop (la escritura en SQLite corre en otro hilo).
+
+Uso: python benchmarks/bench_persistencia.py [--mensajes 5000] [--usuarios 30] [--por-ciclo 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from copy import deepcopy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from persistencia import PersistenciaSQLite
+
+async def simular(mensajes, usuarios, por_ciclo):
+    """Devuelve (µs por mensaje en total, µs por mensaje en el event loop)."""
+    persistencia = PersistenciaSQLite()
+    user_data = {u: {} for u in range(usuarios)}
+    sucios = set()
+    en_loop = 0.0
+    t0 = time.perf_counter()
+    for i in range(mensajes):
+        u = i % usuarios
+        # Lo que deja un mensaje de una carga de línea/empaque en user_data
+        user_data[u].update(fecha="2025-10-14", empresa="Kamada", tipo="Tomate",
+                            trabajadores=list(range(i % 25)), responsable_registro=u)
+        sucios.add(u)
+        if (i + 1) % por_ciclo == 0 or i == mensajes - 1:
+            # Lo mismo que Application.update_persistence: copia y update_* de lo que cambió
+            t1 = time.perf_counter()
+            await asyncio.gather(
+                *(persistencia.update_user_data(u, deepcopy(user_data[u])) for u in sucios),
+                *(persistencia.update_conversation("linea", (u, u), i % 7) for u in sucios),
+            )
+            en_loop += time.perf_counter() - t1
+            sucios.clear()
+            await persistencia.flush()
+    total = time.perf_counter() - t0
+    return total * 1e6 / mensajes, en_loop * 1e6 / mensajes
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensajes", type=int, default=5000)
+    parser.add_argument("--usuarios", type=int, default=30)
+    parser.add_argument("--por-ciclo", type=int, default=200,
+                        help="mensajes por ciclo de guardado (≈ mensajes por segundo × update_interval)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for nombre, por_ciclo in (("guardar en cada mensaje", 1), (f"por ciclos de {args.por_ciclo}", args.por_ciclo)):
+            database.DB_NAME = os.path.join(tmp, f"persistencia_{por_ciclo}.db")
+            database.init_db()
+            total, en_loop = asyncio.run(simular(args.mensajes, args.usuarios, por_ciclo))
+            print(f"{nombre:<26} {total:>9.1f} µs/mensaje   event loop {en_loop:>7.1f} µs/mensaje")
+            database.cerrar_conexiones()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bot_falso.py
+"""Bot de Telegram falso dentro del proceso, para las pruebas de carga (sin red ni servidor HTTP).
+
+RequestFalso reemplaza al cliente HTTP del Bot de PTB: responde getMe, sendMessage, editMessageText,
+sendDocument, sendPhoto, sendMediaGroup, getChat y demás métodos como lo haría la API, y deja el
+texto de cada mensaje enviado en la bandeja (asyncio.Queue) del chat correspondiente.
+Uso: ApplicationBuilder().token(...).request(RequestFalso()).get_updates_request(RequestFalso()) …
+"""
+import asyncio
+import json
+import time
+
+from telegram.request import BaseRequest
+
+BOT = {"id": 1, "is_bot": True, "first_name": "Kamada", "username": "kamada_bot"}
+
+# Métodos que envían o editan un mensaje visible para el usuario
+_MENSAJES = ("sendMessage", "editMessageText", "sendDocument", "sendPhoto", "sendMediaGroup")
+
+class RequestFalso(BaseRequest):
+    def __init__(self, latencia: float = 0.0):
+        self.latencia = latencia  # segundos que tarda cada llamada (simula la red)
+        self.llamadas = {}        # método -> cantidad
+        self._bandejas = {}
+        self._mensajes = 0
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def bandeja(self, chat_id: int) -> asyncio.Queue:
+        """Textos de los mensajes que el bot envió (o editó) en el chat, en orden."""
+        cola = self._bandejas.get(chat_id)
+        if cola is None:
+            cola = self._bandejas[chat_id] = asyncio.Queue()
+        return cola
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        metodo = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data is not None else {}
+        self.llamadas[metodo] = self.llamadas.get(metodo, 0) + 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        return 200, json.dumps({"ok": True, "result": self._resultado(metodo, params)}).encode()
+
+    def _resultado(self, metodo, params):
+        if metodo == "getMe":
+            return BOT
+        if metodo == "getChat":
+            chat_id = int(params["chat_id"])
+            return {"id": chat_id, "type": "private", "username": f"usuario{chat_id}"}
+        if metodo in _MENSAJES:
+            chat_id = int(params["chat_id"])
+            texto = params.get("text") or params.get("caption") or f"[{metodo}]"
+            self.bandeja(chat_id).put_nowait(texto)
+            if metodo == "sendMediaGroup":
+                return [self._mensaje(chat_id, texto) for _ in params["media"]]
+            return self._mensaje(chat_id, texto)
+        return True  # answerCallbackQuery, setWebhook, deleteWebhook, …
+
+    def _mensaje(self, chat_id, texto):
+        self._mensajes += 1
+        return {"message_id": self._mensajes, "date": int(time.time()), "text": texto, "from": BOT,
+                "chat": {"id": chat_id, "type": "private"}}
@@ -0,0 +1,236 @@
+# benchmarks/carga_conversaciones.py
+"""Prueba de carga del bot completo: muchos usuarios simulados recorriendo las conversaciones a la vez.
+
+Arma el Application real de main.py (construir_app: todos los ConversationHandler, persistencia y
+limitador de envíos) con el bot falso de bot_falso.py en lugar de Telegram, sobre una base temporal
+con --registros registros. Cada usuario repite --repeticiones veces un flujo elegido según --mezcla
+(sardina, mesa, linea, empaque, resumen) y cada paso espera la respuesta del bot antes del siguiente.
+
+Informa el throughput (updates y flujos por segundo) y la latencia p50/p95/p99 de cada paso, desde
+que el update entra a la cola del Application hasta que el bot envía la respuesta esperada.
+Con los límites reales de envío (por defecto) un usuario recibe ~1 mensaje/s tras una ráfaga de
+ENVIOS_RAFAGA_CHAT; --sin-limites los quita para medir sólo el bot. --pausa simula el tiempo que
+tarda una persona en responder. --metricas muestra al final el resumen de /stats (metricas.py).
+
+Uso: python benchmarks/carga_conversaciones.py [--usuarios 50] [--repeticiones 3] [--pausa 0]
+         [--mezcla sardina:2,mesa:2,linea:3,empaque:3,resumen:1] [--registros 50000] [--sin-limites]
+         [--concurrentes N] [--metricas]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Paso: (nombre, "texto" o "boton", valor, comienzo de la respuesta esperada)
+FLUJOS = {
+    "sardina": [
+        ("comando", "texto", "/sardina", "🔑"),
+        ("clave", "texto", "123", "📅"),
+        ("fecha", "texto", "{fecha}", "🏭"),
+        ("empresa", "boton", "Kamada", "🚛"),
+        ("proveedor", "texto", "Proveedor A", "🐟"),
+        ("cestas", "texto", "3", "⚖️"),
+        ("kg", "texto", "45.5", "👤"),
+        ("ids", "texto", "{id}", "**Confirme"),
+        ("confirmar", "boton", "confirmar_si", "✅ Registro guardado"),
+    ],
+    "mesa": [
+        ("comando", "texto", "/mesa", "🔑"),
+        ("clave", "texto", "123", "📅"),
+        ("fecha", "texto", "{fecha}", "🏭"),
+        ("empresa", "boton", "Kamada", "👥"),
+        ("ids", "texto", "{ids}", "🧺"),
+        ("cestas", "texto", "4", "**Confirme"),
+        ("confirmar", "boton", "confirmar_si", "✅ Registro guardado"),
+    ],
+    "linea": [
+        ("comando", "texto", "/linea", "🔑"),
+        ("clave", "texto", "123", "📅"),
+        ("fecha", "texto", "{fecha}", "🏭"),
+        ("empresa", "boton", "Pariamar", "🥫"),
+        ("tipo", "boton", "Tomate", "👥"),
+        ("ids", "texto", "{ids}", "📦"),
+        ("cajas", "texto", "2.5", "**Confirme"),
+        ("confirmar", "boton", "confirmar_si", "✅ Registro guardado"),
+    ],
+    "empaque": [
+        ("comando", "texto", "/empaque", "🔑"),
+        ("clave", "texto", "123", "📅"),
+        ("fecha", "texto", "{fecha}", "🏭"),
+        ("empresa", "boton", "Kamada", "🥫"),
+        ("tipo", "boton", "Aceite", "👥"),
+        ("ids", "texto", "{ids}", "📦"),
+        ("cajas", "texto", "3", "**Confirme"),
+        ("confirmar", "boton", "confirmar_si", "✅ Registro guardado"),
+    ],
+    "resumen": [
+        ("comando", "texto", "/resumen", "🔑"),
+        ("clave", "texto", "123", "Ingrese fecha"),
+        ("reporte", "texto", "{fecha}", "✅ Operación finalizada"),
+    ],
+}
+ORDEN_PASOS = ["comando", "clave", "fecha", "empresa", "tipo", "proveedor", "ids", "cestas", "kg", "cajas",
+               "confirmar", "reporte"]
+
+class Simulacion:
+    def __init__(self, app, request, args):
+        self.app = app
+        self.request = request
+        self.args = args
+        self.latencias = {}  # paso -> [segundos]
+        self.errores = []
+        self.updates = 0
+        self._update_id = 0
+
+    def _update(self, usuario, tipo, valor):
+        from telegram import Update
+
+        self._update_id += 1
+        persona = {"id": usuario, "is_bot": False, "first_name": f"Supervisor {usuario}"}
+        chat = {"id": usuario, "type": "private"}
+        if tipo == "boton":
+            datos = {"callback_query": {
+                "id": str(self._update_id), "from": persona, "chat_instance": str(usuario), "data": valor,
+                "message": {"message_id": self._update_id, "date": int(time.time()), "chat": chat,
+                            "from": {"id": 1, "is_bot": True, "first_name": "Kamada"}, "text": "…"},
+            }}
+        else:
+            datos = {"message": {"message_id": self._update_id, "date": int(time.time()), "chat": chat,
+                                 "from": persona, "text": valor}}
+            if valor.startswith("/"):
+                datos["message"]["entities"] = [{"type": "bot_command", "offset": 0, "length": len(valor)}]
+        return Update.de_json({"update_id": self._update_id, **datos}, self.app.bot)
+
+    async def _esperar(self, bandeja, esperado):
+        while True:
+            texto = await asyncio.wait_for(bandeja.get(), self.args.timeout)
+            if texto.startswith(esperado):
+                return
+            if texto.startswith("❌"):
+                raise RuntimeError(texto.splitlines()[0])
+
+    async def usuario(self, usuario, rnd):
+        bandeja = self.request.bandeja(usuario)
+        nombres, pesos = zip(*self.args.mezcla)
+        for _ in range(self.args.repeticiones):
+            flujo = rnd.choices(nombres, pesos)[0]
+            ids = rnd.sample(range(1, self.args.trabajadores + 1), rnd.randint(1, 8))
+            fecha = date(2025, 10, 1) + timedelta(days=rnd.randrange(30))
+            valores = {"fecha": fecha.strftime("%d/%m/%Y"), "id": str(ids[0]), "ids": ", ".join(map(str, ids))}
+            for paso, tipo, valor, esperado in FLUJOS[flujo]:
+                while not bandeja.empty():
+                    bandeja.get_nowait()
+                t0 = time.perf_counter()
+                await self.app.update_queue.put(self._update(usuario, tipo, valor.format(**valores)))
+                self.updates += 1
+                try:
+                    await self._esperar(bandeja, esperado)
+                except (asyncio.TimeoutError, RuntimeError) as e:
+                    self.errores.append(f"{flujo}/{paso}: {e or 'sin respuesta'}")
+                    await self.app.update_queue.put(self._update(usuario, "texto", "/cancel"))
+                    break
+                self.latencias.setdefault(paso, []).append(time.perf_counter() - t0)
+                if self.args.pausa:
+                    await asyncio.sleep(rnd.expovariate(1000 / self.args.pausa))
+
+async def correr(args):
+    from telegram.ext import ApplicationBuilder
+    from telegram.warnings import PTBUserWarning
+    from bot_falso import RequestFalso
+
+    # Los avisos de per_message de los ConversationHandler y el log INFO de cada update no aportan aquí
+    warnings.filterwarnings("ignore", category=PTBUserWarning)
+    import main
+    logging.getLogger().setLevel(logging.WARNING)
+
+    request = RequestFalso(latencia=args.latencia / 1000)
+    builder = ApplicationBuilder().token("123:carga").request(request).get_updates_request(RequestFalso())
+    if args.concurrentes:
+        builder = builder.concurrent_updates(args.concurrentes)
+    app = main.construir_app(builder)
+    sim = Simulacion(app, request, args)
+    rnd = random.Random(1)
+    async with app:
+        await app.start()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(sim.usuario(10_000 + u, random.Random(rnd.random()))
+                               for u in range(args.usuarios)))
+        duracion = time.perf_counter() - t0
+        await app.stop()
+    return sim, duracion
+
+def _p(valores, q):
+    return valores[min(len(valores) - 1, int(q * len(valores)))] * 1000
+
+def _mezcla(texto):
+    mezcla = []
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition(":")
+        if nombre not in FLUJOS:
+            raise argparse.ArgumentTypeError(f"flujo desconocido: {nombre}")
+        mezcla.append((nombre, float(peso or 1)))
+    return mezcla
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--repeticiones", type=int, default=3, help="flujos por usuario")
+    parser.add_argument("--mezcla", type=_mezcla, default=_mezcla("sardina:2,mesa:2,linea:3,empaque:3,resumen:1"))
+    parser.add_argument("--pausa", type=float, default=0, help="ms promedio entre pasos de un usuario")
+    parser.add_argument("--registros", type=int, default=50_000, help="registros de producción de la base")
+    parser.add_argument("--trabajadores", type=int, default=500)
+    parser.add_argument("--latencia", type=float, default=0, help="ms por llamada a la API falsa")
+    parser.add_argument("--concurrentes", type=int, default=0,
+                        help="updates procesados a la vez (0: como main.py)")
+    parser.add_argument("--sin-limites", action="store_true", help="sin los límites de envío de Telegram")
+    parser.add_argument("--timeout", type=float, default=120, help="segundos máximos por paso")
+    parser.add_argument("--metricas", action="store_true", help="mostrar el resumen de /stats al final")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Antes de importar config: la caché de reportes y los límites de envío se leen de ahí
+        os.environ["REPORTES_CACHE_DIR"] = os.path.join(tmp, "cache")
+        if args.sin_limites:
+            os.environ.update(ENVIOS_MAX_POR_SEG="1e9", ENVIOS_POR_CHAT_SEG="1e9", ENVIOS_GRUPO_POR_MIN="1e9")
+        import database
+        import db_async
+        import plantilla
+        from bench_indices import poblar
+
+        database.DB_NAME = os.path.join(tmp, "carga.db")
+        database.init_db()
+        poblar(args.registros, 30, args.trabajadores, date(2025, 10, 1))
+        plantilla.cargar()
+        sim, duracion = asyncio.run(correr(args))
+        db_async.cerrar()
+        database.cerrar_conexiones()
+        from reportes import cerrar_pool_reportes
+        cerrar_pool_reportes()
+
+    flujos = sum(len(v) for k, v in sim.latencias.items() if k in ("confirmar", "reporte"))
+    print(f"{args.usuarios} usuarios, {sim.updates} updates en {duracion:.1f} s: "
+          f"{sim.updates / duracion:.1f} updates/s, {flujos / duracion:.2f} flujos completos/s, "
+          f"{len(sim.errores)} errores")
+    print(f"{'paso':<11} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for paso in ORDEN_PASOS:
+        valores = sorted(sim.latencias.get(paso, []))
+        if valores:
+            print(f"{paso:<11} {len(valores):>6} {_p(valores, 0.5):>9.1f} {_p(valores, 0.95):>9.1f} "
+                  f"{_p(valores, 0.99):>9.1f}")
+    for error in sim.errores[:10]:
+        print("error:", error)
+    if args.metricas:
+        import metricas
+        print(metricas.resumen(max_por_familia=8))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# benchmarks/e2e_webhook.py
+"""Prueba local de punta a punta del modo webhook y latencia update→respuesta contra polling.
+
+Corre el bot real (main.main(): construir_app y la rama de BOT_MODO/WEBHOOK_* de config.py) en un
+proceso aparte, configurado sólo por variables de entorno, contra una API de Telegram falsa
+(api_falsa.py) para no depender de internet; lo único que cambia en ese proceso es la URL de la API.
+- webhook: publica updates /menu en el listener con WEBHOOK_SECRET y mide hasta que el bot responde;
+  también verifica que un POST sin el secreto correcto se rechaza con 403 y no recibe respuesta.
+- polling: encola los mismos updates en la API falsa (entregados por getUpdates con long polling).
+Al final detiene el bot con SIGINT, como en producción, y exige que termine sin error.
+En local las dos vías son rápidas; con Telegram real el polling suma además la ida y vuelta a sus
+servidores por cada tanda de updates.
+
+Requiere python-telegram-bot[webhooks] (tornado) para el modo webhook.
+Uso: python benchmarks/e2e_webhook.py [--updates 300] [--modos webhook,polling]
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from api_falsa import ApiFalsa
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN = "123:prueba"
+SECRETO = "secreto_e2e"
+ARRANQUE_SEG = 60
+RESPUESTA_SEG = 10
+CHAT_BASE = 10_000  # cada update llega de un chat distinto: el límite por chat de envios.py no interviene
+
+class FalloE2E(Exception):
+    """El bot no se comportó como se esperaba."""
+
+def update_sintetico(update_id: int):
+    """/menu de un usuario no autorizado: el bot responde con un único mensaje."""
+    chat = CHAT_BASE + update_id
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": int(time.time()), "text": "/menu",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 5}],
+            "chat": {"id": chat, "type": "private"},
+            "from": {"id": chat, "is_bot": False, "first_name": "Operador"},
+        },
+    }
+
+def ejecutar_bot(base_url: str, db: str):
+    """Proceso hijo: main.main() tal cual, con la base temporal y la API falsa."""
+    sys.path.insert(0, RAIZ)
+    from telegram.ext import ApplicationBuilder
+    import database
+    import main
+
+    database.DB_NAME = db
+    main.ApplicationBuilder = lambda: ApplicationBuilder().base_url(base_url)
+    main.main()
+
+class Bot:
+    """El bot corriendo en un proceso aparte con BOT_MODO=modo."""
+
+    def __init__(self, api, modo: str, tmp: str, puerto_webhook: int):
+        self.url = f"http://127.0.0.1:{puerto_webhook}/telegram"
+        self.log = os.path.join(tmp, f"bot_{modo}.log")
+        env = dict(os.environ, BOT_MODO=modo, BOT_TOKEN=TOKEN, WEBHOOK_URL=self.url,
+                   WEBHOOK_LISTEN="127.0.0.1", WEBHOOK_PORT=str(puerto_webhook), WEBHOOK_PATH="telegram",
+                   WEBHOOK_SECRET=SECRETO, ENVIOS_MAX_POR_SEG="100000",
+                   REPORTES_CACHE_DIR=os.path.join(tmp, "cache"), METRICAS_ARCHIVO="", E2E_API=api.base_url)
+        with open(self.log, "w") as log:
+            self.proceso = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--bot", os.path.join(tmp, "kamadata.db")],
+                env=env, cwd=tmp, stdout=log, stderr=subprocess.STDOUT)
+
+    def verificar_vivo(self):
+        if self.proceso.poll() is not None:
+            raise FalloE2E(f"el bot terminó con código {self.proceso.returncode}:\n{self._final_log()}")
+
+    def detener(self):
+        """SIGINT como Ctrl+C; el bot debe cerrar el listener y los recursos y salir con 0."""
+        if self.proceso.poll() is None:
+            self.proceso.send_signal(signal.SIGINT)
+            try:
+                self.proceso.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.proceso.kill()
+                self.proceso.wait()
+                raise FalloE2E(f"el bot no se detuvo con SIGINT en 30 s:\n{self._final_log()}")
+        if self.proceso.returncode != 0:
+            raise FalloE2E(f"el bot terminó con código {self.proceso.returncode}:\n{self._final_log()}")
+
+    def _final_log(self, lineas=30):
+        with open(self.log) as f:
+            return "".join(f.readlines()[-lineas:])
+
+def _respuesta(api, chat_id: int, desde: int):
+    for t, _, chat in api.enviados[desde:]:
+        if chat == chat_id:
+            return t
+    return None
+
+def _esperar_respuesta(api, bot, update_id: int, limite: float, desde: int = 0):
+    """Hora (perf_counter) en que el bot respondió al update."""
+    fin = time.perf_counter() + limite
+    while (t := _respuesta(api, CHAT_BASE + update_id, desde)) is None:
+        bot.verificar_vivo()
+        if time.perf_counter() > fin:
+            raise FalloE2E(f"el bot no respondió al update {update_id} en {limite:.0f} s")
+        time.sleep(0.0005)
+    return t
+
+def _resumen(nombre, latencias):
+    latencias = sorted(latencias)
+    p = lambda q: latencias[min(len(latencias) - 1, int(q * len(latencias)))] * 1000
+    print(f"{nombre:<8} {len(latencias):>5} updates   p50 {p(0.5):>7.2f} ms   p95 {p(0.95):>7.2f} ms   "
+          f"máx {latencias[-1] * 1000:>7.2f} ms")
+
+def _publicar(cliente, bot, update_id: int, secreto: str):
+    return cliente.post(bot.url, json=update_sintetico(update_id),
+                        headers={"X-Telegram-Bot-Api-Secret-Token": secreto})
+
+def medir_webhook(api, tmp, puerto_webhook, n, primer_id):
+    bot = Bot(api, "webhook", tmp, puerto_webhook)
+    try:
+        with httpx.Client() as cliente:
+            # Arranque: se reintenta hasta que el listener acepta conexiones y el bot responde
+            fin = time.perf_counter() + ARRANQUE_SEG
+            while True:
+                bot.verificar_vivo()
+                try:
+                    r = _publicar(cliente, bot, primer_id, SECRETO)
+                    break
+                except httpx.TransportError:
+                    if time.perf_counter() > fin:
+                        raise FalloE2E(f"el listener no aceptó conexiones en {ARRANQUE_SEG} s")
+                    time.sleep(0.1)
+            if r.status_code != 200:
+                raise FalloE2E(f"el update con el secreto correcto dio {r.status_code}")
+            _esperar_respuesta(api, bot, primer_id, ARRANQUE_SEG)
+
+            intruso = primer_id + 1
+            r = _publicar(cliente, bot, intruso, "incorrecto")
+            if r.status_code != 403:
+                raise FalloE2E(f"un secreto incorrecto debería dar 403, dio {r.status_code}")
+
+            latencias = []
+            for i in range(primer_id + 2, primer_id + n + 2):
+                desde = len(api.enviados)
+                t0 = time.perf_counter()
+                r = _publicar(cliente, bot, i, SECRETO)
+                if r.status_code != 200:
+                    raise FalloE2E(f"el update {i} dio {r.status_code}")
+                latencias.append(_esperar_respuesta(api, bot, i, RESPUESTA_SEG, desde) - t0)
+            if _respuesta(api, CHAT_BASE + intruso, 0) is not None:
+                raise FalloE2E("el update con secreto incorrecto llegó a un handler")
+    finally:
+        bot.detener()
+    return latencias
+
+def medir_polling(api, tmp, n, primer_id):
+    bot = Bot(api, "polling", tmp, 0)
+    try:
+        api.pendientes.put(update_sintetico(primer_id))
+        _esperar_respuesta(api, bot, primer_id, ARRANQUE_SEG)
+        latencias = []
+        for i in range(primer_id + 1, primer_id + n + 1):
+            desde = len(api.enviados)
+            t0 = time.perf_counter()
+            api.pendientes.put(update_sintetico(i))
+            latencias.append(_esperar_respuesta(api, bot, i, RESPUESTA_SEG, desde) - t0)
+    finally:
+        bot.detener()
+    return latencias
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=300)
+    parser.add_argument("--puerto-webhook", type=int, default=18443)
+    parser.add_argument("--modos", default="webhook,polling")
+    parser.add_argument("--bot", metavar="DB", help=argparse.SUPPRESS)  # proceso hijo (ver Bot)
+    args = parser.parse_args()
+    if args.bot:
+        ejecutar_bot(os.environ["E2E_API"], args.bot)
+        return
+
+    api = ApiFalsa().iniciar()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            primer_id = 1
+            for modo in args.modos.split(","):
+                if modo == "webhook":
+                    _resumen(modo, medir_webhook(api, tmp, args.puerto_webhook, args.updates, primer_id))
+                elif modo == "polling":
+                    _resumen(modo, medir_polling(api, tmp, args.updates, primer_id))
+                else:
+                    raise SystemExit(f"modo desconocido: {modo}")
+                primer_id += args.updates + 2  # ids (y chats) nuevos para el siguiente modo
+    except FalloE2E as e:
+        raise SystemExit(f"FALLO: {e}")
+    finally:
+        api.detener()
+    print(f"OK ({args.modos}): main.py arranca según BOT_MODO, responde y se detiene limpio"
+          + ("; el listener rechaza el secreto incorrecto" if "webhook" in args.modos else ""))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/latencia_escritura.py
+"""Latencia de los updates de otros usuarios mientras se hace una escritura lenta.
+
+Mientras un administrador inserta un bloque grande (como /cargar_produccion), varios usuarios
+simulados envían un update cada --intervalo ms; cada update hace una lectura de la base (como
+generar un resumen de confirmación) y se mide cuánto tarda desde que llega hasta que termina.
+Se compara llamar a database.py directamente desde el event loop (como antes) con db_async.
+
+También se mide la escritura de un supervisor que confirma su carga durante la escritura lenta.
+SQLite admite un escritor a la vez: con db_async la carga espera en la cola del hilo escritor a que
+termine el bloque en curso (no toda la escritura lenta), sin errores "database is locked".
+
+Uso: python benchmarks/latencia_escritura.py [--filas 300000] [--usuarios 20] [--intervalo 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+import db_async
+from bench_indices import poblar
+
+# Igual que handlers/carga_produccion.py: la escritura lenta se hace en transacciones de este tamaño
+BLOQUE_INSERCION = 5000
+
+def _filas(n):
+    return [("2025-11-20", "Línea", "Kamada", "Tomate", 1.0, (i % 500) + 1, 1, None) for i in range(n)]
+
+async def _insertar_en_bloques(lote):
+    for i in range(0, len(lote), BLOQUE_INSERCION):
+        await db_async.insertar_registros(lote[i:i + BLOQUE_INSERCION])
+
+async def _usuario(asincrono, latencias, intervalo):
+    # Los updates llegan cada 'intervalo', se atiendan o no: la latencia se cuenta desde que
+    # llegó el update, así los que quedan esperando detrás de un event loop bloqueado también cuentan
+    llegada = time.perf_counter()
+    while True:
+        await asyncio.sleep(max(0.0, llegada - time.perf_counter()))
+        if asincrono:
+            await db_async.leer(database.obtener_version_datos)
+        else:
+            database.obtener_version_datos()
+        latencias.append(time.perf_counter() - llegada)
+        llegada += intervalo
+
+async def simular(asincrono, filas, usuarios, intervalo):
+    """Devuelve (latencias de los updates, duración de la escritura lenta, espera del supervisor)."""
+    lote = _filas(filas)
+    # La escritura lenta empieza con los usuarios ya activos
+    calentamiento = []
+    tareas = [asyncio.create_task(_usuario(asincrono, calentamiento, intervalo)) for _ in range(usuarios)]
+    await asyncio.sleep(0.2)
+    for tarea in tareas:
+        tarea.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
+    latencias = []
+    tareas = [asyncio.create_task(_usuario(asincrono, latencias, intervalo)) for _ in range(usuarios)]
+    await asyncio.sleep(0.05)
+
+    t0 = time.perf_counter()
+    if asincrono:
+        lenta = asyncio.create_task(_insertar_en_bloques(lote))
+        await asyncio.sleep(0.05)
+        t1 = time.perf_counter()
+        await db_async.agregar_registros_lote([1, 2, 3], "Mesa", "Kamada", 2.0, 1, fecha="2025-10-14")
+        supervisor = time.perf_counter() - t1
+        await lenta
+    else:
+        for i in range(0, len(lote), BLOQUE_INSERCION):
+            database.insertar_registros(lote[i:i + BLOQUE_INSERCION])
+        t1 = time.perf_counter()
+        database.agregar_registros_lote([1, 2, 3], "Mesa", "Kamada", 2.0, 1, fecha="2025-10-14")
+        supervisor = time.perf_counter() - t1
+    duracion = time.perf_counter() - t0
+
+    # Un momento más para atender los updates que quedaron encolados
+    await asyncio.sleep(0.2)
+    for tarea in tareas:
+        tarea.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
+    return latencias, duracion, supervisor
+
+def _resumen(nombre, latencias, duracion, supervisor):
+    latencias = sorted(latencias)
+    p = lambda q: latencias[min(len(latencias) - 1, int(q * len(latencias)))] * 1000
+    print(f"{nombre:<10} escritura lenta {duracion:5.2f} s   {len(latencias):>6} updates   "
+          f"p50 {p(0.5):>8.2f} ms   p99 {p(0.99):>8.2f} ms   máx {latencias[-1] * 1000:>8.1f} ms   "
+          f"supervisor {supervisor * 1000:>7.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=300_000, help="filas de la escritura lenta")
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--intervalo", type=float, default=20, help="ms entre updates de cada usuario")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for nombre, asincrono in (("directo", False), ("db_async", True)):
+            database.DB_NAME = os.path.join(tmp, f"latencia_{nombre}.db")
+            database.init_db()
+            poblar(50_000, 30, 500, date(2025, 10, 1))
+            resultado = asyncio.run(simular(asincrono, args.filas, args.usuarios, args.intervalo / 1000))
+            _resumen(nombre, *resultado)
+            db_async.cerrar()
+            database.cerrar_conexiones()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/micro_database.py
+"""Micro-benchmarks de las funciones de database.py sobre una base sintética de tamaño configurable.
+
+Mide cada función por separado (escrituras de una carga, lotes, lecturas de los reportes,
+persistencia) y muestra la mediana, el p95 y las operaciones por segundo. Sirve para comparar
+cambios en database.py con distintos volúmenes: --filas 100000 para una temporada, 2000000 para
+varios años. Con --db se reutiliza una base ya generada (no se vuelve a poblar si tiene datos).
+
+Uso: python benchmarks/micro_database.py [--filas 200000] [--dias 365] [--trabajadores 3000]
+         [--repeticiones 50] [--db /tmp/micro.db] [--solo nombre1,nombre2]
+"""
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from bench_indices import poblar
+
+INICIO = date(2024, 1, 1)
+
+def casos(args):
+    """[(nombre, función sin argumentos)] en el orden en que se miden."""
+    dia = (INICIO + timedelta(days=args.dias // 2)).isoformat()
+    mes_fin = (INICIO + timedelta(days=args.dias // 2 + 30)).isoformat()
+    anio_fin = (INICIO + timedelta(days=args.dias - 1)).isoformat()
+    # Las escrituras van a un día fuera del rango poblado, para no agrandar los días que se consultan
+    nuevo = (INICIO + timedelta(days=args.dias)).isoformat()
+    ids = list(range(1, 11))
+    sesion = {("user", 1): pickle.dumps({"fecha": nuevo, "empresa": "Kamada", "ids": ids})}
+    mil = [(nuevo, "Línea", "Kamada", "Tomate", 2.0, (i % args.trabajadores) + 1, 1, None) for i in range(1000)]
+    return [
+        ("agregar_registro", lambda: database.agregar_registro(
+            1, "Sardina", "Kamada", 45.5, 1, cantidad_auxiliar=3, tipo="Proveedor A", fecha=nuevo)),
+        ("agregar_registros_lote(10)", lambda: database.agregar_registros_lote(
+            ids, "Línea", "Kamada", 2.5, 1, tipo="Tomate", fecha=nuevo)),
+        ("insertar_registros(1000)", lambda: database.insertar_registros(mil)),
+        ("guardar_persistencia", lambda: database.guardar_persistencia(sesion, {})),
+        ("obtener_version_datos", database.obtener_version_datos),
+        ("listar_trabajadores", database.listar_trabajadores),
+        ("registros_por_fecha", lambda: database.obtener_registros_por_fecha(dia)),
+        ("registros_periodo(31d)", lambda: database.obtener_registros_periodo(dia, mes_fin)),
+        ("iterar_periodo(31d)", lambda: sum(1 for _ in database.iterar_registros_periodo(dia, mes_fin))),
+        ("totales_por_area(31d)", lambda: database.obtener_totales_por_area(dia, mes_fin)),
+        ("totales_por_area(año)", lambda: database.obtener_totales_por_area(INICIO.isoformat(), anio_fin)),
+        ("totales_trabajador(31d)", lambda: database.obtener_totales_por_trabajador(dia, mes_fin)),
+        ("totales_trabajador(año)", lambda: database.obtener_totales_por_trabajador(INICIO.isoformat(), anio_fin)),
+    ]
+
+def medir(nombre, fn, repeticiones):
+    fn()  # calienta la caché de páginas y las sentencias preparadas
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t0)
+    tiempos.sort()
+    mediana = tiempos[len(tiempos) // 2]
+    p95 = tiempos[min(len(tiempos) - 1, int(0.95 * len(tiempos)))]
+    print(f"  {nombre:<27} mediana {mediana * 1e3:>9.3f} ms   p95 {p95 * 1e3:>9.3f} ms   "
+          f"{1 / mediana:>10.0f} op/s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=200_000)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--trabajadores", type=int, default=3000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--db", default=None, help="ruta de la base sintética (por defecto, temporal)")
+    parser.add_argument("--solo", default=None, help="nombres de los casos a medir, separados por coma")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.db is None:
+        tmp = tempfile.TemporaryDirectory()
+        args.db = os.path.join(tmp.name, "micro.db")
+    database.DB_NAME = args.db
+    database.init_db()
+    with database._lectura() as cur:
+        existentes = cur.execute("SELECT COUNT(*) FROM produccion").fetchone()[0]
+    if existentes == 0:
+        t0 = time.perf_counter()
+        poblar(args.filas, args.dias, args.trabajadores, INICIO)
+        print(f"Base sintética: {args.filas} filas, {args.dias} días, {args.trabajadores} trabajadores "
+              f"en {time.perf_counter() - t0:.1f} s ({args.db})")
+    else:
+        print(f"Base existente: {existentes} filas ({args.db})")
+
+    solo = set(args.solo.split(",")) if args.solo else None
+    for nombre, fn in casos(args):
+        if solo is None or nombre in solo:
+            medir(nombre, fn, args.repeticiones)
+
+    database.cerrar_conexiones()
+    if tmp is not None:
+        tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
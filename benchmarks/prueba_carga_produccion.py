@@ -0,0 +1,75 @@
+# benchmarks/prueba_carga_produccion.py
+"""Prueba la validación de la carga masiva de producción (handlers/carga_produccion.py).
+
+- Fechas: DD/MM/AAAA y AAAA-MM-DD (con día <= 12, que no debe leerse con día y mes invertidos)
+  quedan con la fecha correcta; cualquier otro formato va a produccion_rechazadas.csv.
+- Cantidades: infinitas, no positivas o con más de 2 decimales se rechazan.
+Sale con código 1 si alguna verificación falla.
+
+Uso: python benchmarks/prueba_carga_produccion.py
+"""
+import csv
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from handlers.carga_produccion import preparar_produccion
+
+# (Fecha, Cantidad, fecha guardada o None si la fila se rechaza)
+CASOS = [
+    ("2025-10-03", "5", "2025-10-03"),
+    ("03/10/2025", "5", "2025-10-03"),
+    ("14/10/2025", "5", "2025-10-14"),
+    ("2025-10-14", "5", "2025-10-14"),
+    ("2025-01-02", "5", "2025-01-02"),
+    (" 3/1/2025 ", "5", "2025-01-03"),
+    ("10/03/25", "5", None),
+    ("2025/10/03", "5", None),
+    ("10-03-2025", "5", None),
+    ("31/02/2025", "5", None),
+    ("", "5", None),
+    ("03/10/2025", "inf", None),
+    ("03/10/2025", "0", None),
+    ("03/10/2025", "1.005", None),
+]
+
+def main():
+    fallos = []
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "prueba.db")
+        database.init_db()
+        database.upsert_trabajadores_lote([(1, "Trabajador 1")])
+
+        archivo = io.StringIO()
+        escritor = csv.writer(archivo, delimiter=";")
+        escritor.writerow(["Fecha", "Area", "Empresa", "Tipo", "Cantidad", "Trabajador ID"])
+        escritor.writerows((fecha, "Mesa", "Kamada", "", cantidad, 1) for fecha, cantidad, _ in CASOS)
+        filas, filas_archivo, rechazadas, n_rechazadas = preparar_produccion(
+            io.BytesIO(archivo.getvalue().encode()), "prueba.csv", 1)
+        database.cerrar_conexiones()
+
+    guardadas = dict(zip(filas_archivo, (f[0] for f in filas)))
+    motivos = {int(r["Fila"]): r["Motivo"]
+               for r in csv.DictReader(io.StringIO(rechazadas.decode("utf-8-sig")))} if rechazadas else {}
+    for fila, (fecha, cantidad, esperada) in enumerate(CASOS, start=2):
+        obtenida = guardadas.get(fila)
+        print(f"  fila {fila:>2}  {fecha!r:<14} {cantidad:<6} -> {obtenida or 'rechazada: ' + motivos.get(fila, '?')}")
+        if obtenida != esperada:
+            fallos.append(f"fila {fila} ({fecha!r}, {cantidad}): se esperaba {esperada or 'rechazo'}, "
+                          f"quedó {obtenida or 'rechazada'}")
+        if esperada is None and fila not in motivos:
+            fallos.append(f"fila {fila} ({fecha!r}) no está en el archivo de rechazadas")
+    if n_rechazadas != sum(esperada is None for _, _, esperada in CASOS):
+        fallos.append(f"cantidad de rechazadas: {n_rechazadas}")
+
+    for fallo in fallos:
+        print("FALLO:", fallo)
+    if fallos:
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
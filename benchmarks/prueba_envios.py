@@ -0,0 +1,116 @@
+# benchmarks/prueba_envios.py
+"""Prueba el limitador de envíos (envios.py) contra la API de Telegram falsa (api_falsa.py).
+
+- Reparto a muchos chats: compara el envío en serie de antes con el reparto concurrente y verifica
+  que ninguna ventana de 1 s supera el límite global.
+- Ráfaga a un mismo chat: respeta el límite por chat (ráfaga + 1 mensaje/s).
+- RetryAfter: con 429 simulados todos los mensajes llegan (tras la pausa pedida por Telegram).
+Sale con código 1 si alguna verificación falla.
+
+Uso: python benchmarks/prueba_envios.py [--chats 60] [--latencia-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from telegram.ext import ApplicationBuilder
+
+from api_falsa import ApiFalsa
+from envios import LimitadorEnvios, enviar_a_varios
+
+def _max_en_ventana(tiempos, ventana):
+    tiempos = sorted(tiempos)
+    maximo, j = 0, 0
+    for i, t in enumerate(tiempos):
+        while tiempos[j] <= t - ventana:
+            j += 1
+        maximo = max(maximo, i - j + 1)
+    return maximo
+
+async def _con_bot(api, limitador, fn):
+    builder = ApplicationBuilder().token("123:prueba").base_url(api.base_url)
+    if limitador is not None:
+        builder = builder.rate_limiter(limitador)
+    app = builder.build()
+    async with app:
+        return await fn(app.bot)
+
+async def reparto(api, chats, limitador):
+    async def en_serie(bot):
+        for chat_id in chats:
+            await bot.send_message(chat_id=chat_id, text="🔔 Solicitud")
+
+    async def concurrente(bot):
+        return await enviar_a_varios(bot, chats, "🔔 Solicitud")
+
+    t0 = time.perf_counter()
+    await _con_bot(api, None, en_serie)
+    serie = time.perf_counter() - t0
+    api.enviados.clear()
+    t0 = time.perf_counter()
+    fallidos = await _con_bot(api, limitador, concurrente)
+    paralelo = time.perf_counter() - t0
+    return serie, paralelo, fallidos
+
+async def rafaga_mismo_chat(api, limitador, n):
+    async def enviar(bot):
+        await asyncio.gather(*(bot.send_message(chat_id=7, text=f"{i}") for i in range(n)))
+    await _con_bot(api, limitador, enviar)
+
+async def con_retry_after(api, limitador, chats):
+    async def enviar(bot):
+        return await enviar_a_varios(bot, chats, "aviso")
+    return await _con_bot(api, limitador, enviar)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=60)
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    api = ApiFalsa(latencia=args.latencia_ms / 1000).iniciar()
+    limitador = LimitadorEnvios()
+    fallos = []
+    try:
+        chats = list(range(1000, 1000 + args.chats))
+        serie, paralelo, fallidos = asyncio.run(reparto(api, chats, limitador))
+        pico = _max_en_ventana([t for t, _, _ in api.enviados], 1.0)
+        print(f"Reparto a {args.chats} chats: en serie {serie:.2f} s, concurrente con límite {paralelo:.2f} s, "
+              f"máximo en 1 s: {pico}")
+        if fallidos or len(api.enviados) != args.chats:
+            fallos.append("no llegaron todos los mensajes del reparto")
+        if pico > limitador._global.tasa + 1:
+            fallos.append("se superó el límite global")
+
+        api.enviados.clear()
+        asyncio.run(rafaga_mismo_chat(api, limitador, 10))
+        tiempos = [t for t, _, c in api.enviados if c == 7]
+        duracion = tiempos[-1] - tiempos[0]
+        print(f"Ráfaga de 10 a un chat: {duracion:.2f} s")
+        # 5 de ráfaga y luego 1 por segundo: el décimo sale ~5 s después del primero
+        if len(tiempos) != 10 or duracion < 4.5:
+            fallos.append("no se respetó el límite por chat")
+
+        api.enviados.clear()
+        api.rechazar = {2000: 2, 2001: 1}
+        api.retry_after = 1
+        t0 = time.perf_counter()
+        fallidos = asyncio.run(con_retry_after(api, LimitadorEnvios(), [2000, 2001, 2002, 2003]))
+        llegados = sorted(c for _, _, c in api.enviados)
+        print(f"Con RetryAfter: llegaron {llegados} en {time.perf_counter() - t0:.2f} s")
+        if fallidos or llegados != [2000, 2001, 2002, 2003]:
+            fallos.append("se perdieron mensajes con RetryAfter")
+    finally:
+        api.detener()
+
+    for fallo in fallos:
+        print("FALLO:", fallo)
+    if fallos:
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
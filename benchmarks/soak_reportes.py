@@ -0,0 +1,54 @@
+# benchmarks/soak_reportes.py
+"""Prueba de resistencia: genera cientos de reportes y verifica que la memoria residente
+y los descriptores de archivo abiertos no crecen.
+
+Uso: python benchmarks/soak_reportes.py [--reportes 300] [--filas 30] [--max-crecimiento-mb 15]
+Sale con código 1 si la memoria crece más del umbral tras el calentamiento.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from reportes import construir_reporte
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # Sin /proc (macOS): pico de memoria en bytes; en Windows no hay 'resource'
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**20
+
+def fds_abiertos():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return -1
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reportes", type=int, default=300)
+    parser.add_argument("--filas", type=int, default=30)
+    parser.add_argument("--max-crecimiento-mb", type=float, default=15.0)
+    args = parser.parse_args()
+
+    rows = [("Línea", "Kamada", "Tomate", 1.5 * i, i) for i in range(args.filas)]
+    calentamiento = max(1, args.reportes // 10)
+    base_rss = base_fds = None
+    for i in range(1, args.reportes + 1):
+        construir_reporte(rows)
+        if i == calentamiento:
+            base_rss, base_fds = rss_mb(), fds_abiertos()
+        if i % 50 == 0 or i == args.reportes:
+            print(f"{i:>5} reportes   RSS {rss_mb():8.1f} MB   fds {fds_abiertos()}")
+
+    crecimiento = rss_mb() - base_rss
+    print(f"Crecimiento tras el calentamiento: {crecimiento:.1f} MB, fds {fds_abiertos() - base_fds:+d}")
+    if crecimiento > args.max_crecimiento_mb or fds_abiertos() > base_fds:
+        print("FALLO: la memoria o los descriptores crecen con cada reporte")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
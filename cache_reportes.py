@@ -0,0 +1,83 @@
+# cache_reportes.py
+# Caché en disco de los reportes generados, por (tipo, rango de fechas, empresa, versión de datos).
+# Se desaloja por LRU (fecha de último uso del archivo) con un tope de tamaño total.
+import os
+
+from config import REPORTES_CACHE_DIR, REPORTES_CACHE_MAX_MB
+from database import obtener_version_datos
+
+def clave(tipo: str, inicio: str, fin: str, empresa: str = None, version: int = None) -> str:
+    if version is None:
+        version = obtener_version_datos()
+    return f"{tipo}_{inicio}_{fin}_{empresa or 'todas'}_v{version}"
+
+# Una entrada son los archivos <clave>.pNN.jpg (una imagen por página) y <clave>.xlsx.
+# El Excel se escribe último: su presencia indica que la entrada está completa.
+def _ruta_excel(clave_reporte: str):
+    return os.path.join(REPORTES_CACHE_DIR, clave_reporte + ".xlsx")
+
+def _ruta_pagina(clave_reporte: str, pagina: int):
+    return os.path.join(REPORTES_CACHE_DIR, f"{clave_reporte}.p{pagina:02d}.jpg")
+
+def _escribir(ruta: str, datos: bytes):
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(datos)
+    os.replace(tmp, ruta)  # atómico: otro proceso nunca ve un archivo a medio escribir
+
+def buscar(tipo: str, inicio: str, fin: str, empresa: str = None):
+    """Devuelve (excel_bytes, [jpg_bytes]) si el reporte está en caché y los datos no cambiaron."""
+    c = clave(tipo, inicio, fin, empresa)
+    try:
+        with open(_ruta_excel(c), "rb") as f:
+            excel = f.read()
+        os.utime(_ruta_excel(c))  # marca la entrada como usada recientemente (LRU)
+        imagenes = []
+        while os.path.exists(_ruta_pagina(c, len(imagenes) + 1)):
+            with open(_ruta_pagina(c, len(imagenes) + 1), "rb") as f:
+                imagenes.append(f.read())
+    except FileNotFoundError:
+        return None
+    return excel, imagenes
+
+def guardar(clave_reporte: str, excel: bytes, imagenes):
+    """Guarda el reporte en la caché y desaloja lo que sobre."""
+    os.makedirs(REPORTES_CACHE_DIR, exist_ok=True)
+    for i, jpg in enumerate(imagenes, start=1):
+        _escribir(_ruta_pagina(clave_reporte, i), jpg)
+    _escribir(_ruta_excel(clave_reporte), excel)
+    _desalojar(clave_reporte)
+
+def _desalojar(conservar: str):
+    limite = REPORTES_CACHE_MAX_MB * 1024 * 1024
+    entradas = {}
+    for nombre in os.listdir(REPORTES_CACHE_DIR):
+        if ".tmp" in nombre:
+            continue
+        ruta = os.path.join(REPORTES_CACHE_DIR, nombre)
+        try:
+            st = os.stat(ruta)
+        except FileNotFoundError:
+            continue
+        entrada = entradas.setdefault(nombre.split(".", 1)[0], [0, 0.0, []])
+        entrada[0] += st.st_size
+        entrada[1] = max(entrada[1], st.st_mtime)
+        entrada[2].append(ruta)
+
+    # Las versiones anteriores del mismo reporte ya no se van a servir: se borran siempre
+    prefijo = conservar.rsplit("_v", 1)[0] + "_v"
+    obsoletas = [c for c in entradas if c.startswith(prefijo) and c != conservar]
+    resto = sorted((c for c in entradas if c != conservar and c not in obsoletas),
+                   key=lambda c: entradas[c][1])
+
+    total = sum(e[0] for e in entradas.values())
+    for i, c in enumerate(obsoletas + resto):
+        if i >= len(obsoletas) and total <= limite:
+            break
+        # El Excel primero: sin él la entrada deja de considerarse completa
+        for ruta in sorted(entradas[c][2], key=lambda r: not r.endswith(".xlsx")):
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+        total -= entradas[c][0]
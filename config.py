@@ -1,9 +1,18 @@
 # config.py
+import logging
+import os
+
+import db_async
+from database import listar_usuarios_autorizados
+
+logger = logging.getLogger(__name__)
 
 # Usaremos un set vacío inicialmente. Se recomienda que el ADMIN se incluya al inicio.
 # IMPORTANTE: Reemplace 12345 con su ID de Telegram para que funcione la administración.
 ADMINISTRADORES = {146814016} 
 
+# Caché en memoria de la tabla usuarios_autorizados: se carga al arrancar (cargar_usuarios_autorizados)
+# y se mantiene al día al autorizar o remover, así autorizado() nunca consulta la base.
 USUARIOS_AUTORIZADOS = set()
 
 CLAVES_ACCESO = {
@@ -12,6 +21,7 @@ CLAVES_ACCESO = {
     "linea": "123",
     "empaque": "123",
     "trabajadores": "123",
+    "produccion": "123",
     "reportes": "123"
 }
 
@@ -20,6 +30,46 @@ EMPRESA_PERMISOS = {
     "kamada": ["Kamada", "Pariamar"]
 }
 
+# Reportes: cuántos se generan en paralelo (procesos) y cuánto puede tardar cada uno
+REPORTES_MAX_CONCURRENTES = int(os.getenv("REPORTES_MAX_CONCURRENTES", "2"))
+REPORTES_TIMEOUT_SEG = float(os.getenv("REPORTES_TIMEOUT_SEG", "120"))
+
+# Imagen del reporte: filas por página y máximo de páginas (si se supera, sólo se envía el Excel)
+REPORTES_FILAS_POR_PAGINA = int(os.getenv("REPORTES_FILAS_POR_PAGINA", "40"))
+REPORTES_MAX_PAGINAS = int(os.getenv("REPORTES_MAX_PAGINAS", "10"))
+
+# Caché de reportes ya generados (se reutilizan mientras los datos no cambien)
+REPORTES_CACHE_DIR = os.getenv("REPORTES_CACHE_DIR", "cache_reportes")
+REPORTES_CACHE_MAX_MB = float(os.getenv("REPORTES_CACHE_MAX_MB", "200"))
+
+# Cada cuántos segundos se guardan en la base las conversaciones en curso (persistencia.py).
+# Un corte de luz pierde como mucho este intervalo; un apagado normal lo guarda todo.
+PERSISTENCIA_INTERVALO_SEG = float(os.getenv("PERSISTENCIA_INTERVALO_SEG", "10"))
+
+# Límites de envío a Telegram (envios.py): total por segundo, por chat privado (con ráfaga),
+# por grupo por minuto y reintentos ante RetryAfter
+ENVIOS_MAX_POR_SEG = float(os.getenv("ENVIOS_MAX_POR_SEG", "30"))
+ENVIOS_POR_CHAT_SEG = float(os.getenv("ENVIOS_POR_CHAT_SEG", "1"))
+ENVIOS_RAFAGA_CHAT = int(os.getenv("ENVIOS_RAFAGA_CHAT", "5"))
+ENVIOS_GRUPO_POR_MIN = float(os.getenv("ENVIOS_GRUPO_POR_MIN", "20"))
+ENVIOS_MAX_REINTENTOS = int(os.getenv("ENVIOS_MAX_REINTENTOS", "3"))
+
+# Recepción de updates: "polling" (por defecto) o "webhook". En modo webhook el bot escucha en
+# WEBHOOK_LISTEN:WEBHOOK_PORT/WEBHOOK_PATH (normalmente detrás de un proxy con HTTPS) y registra
+# WEBHOOK_URL en Telegram. Sin WEBHOOK_SECRET se genera uno nuevo en cada arranque.
+BOT_MODO = os.getenv("BOT_MODO", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+
+# Métricas de latencia (metricas.py), visibles con /stats. Si METRICAS_ARCHIVO está definido (un .prom
+# en el directorio del textfile collector de node_exporter) se escriben ahí cada METRICAS_INTERVALO_SEG.
+METRICAS_ACTIVAS = os.getenv("METRICAS_ACTIVAS", "1") != "0"
+METRICAS_ARCHIVO = os.getenv("METRICAS_ARCHIVO")
+METRICAS_INTERVALO_SEG = float(os.getenv("METRICAS_INTERVALO_SEG", "15"))
+
 def autorizado(user_id: int) -> bool:
     """Verifica si el usuario está en la lista de autorizados o es administrador."""
     return user_id in USUARIOS_AUTORIZADOS or user_id in ADMINISTRADORES
@@ -34,16 +84,23 @@ def validar_clave(area: str, clave: str) -> bool:
 
 # NUEVAS FUNCIONES para manejar la autorización dinámica:
 
-def agregar_usuario_autorizado(user_id: int):
-    """Añade un usuario al conjunto de autorizados."""
+def cargar_usuarios_autorizados():
+    """Carga los usuarios autorizados guardados en la base (llamar al arrancar, después de init_db)."""
+    USUARIOS_AUTORIZADOS.clear()
+    USUARIOS_AUTORIZADOS.update(user_id for user_id, _, _ in listar_usuarios_autorizados())
+
+async def agregar_usuario_autorizado(user_id: int, aprobado_por: int = None):
+    """Añade un usuario al conjunto de autorizados y lo guarda en la base con quién y cuándo lo aprobó."""
     if user_id not in ADMINISTRADORES:
+        # Primero la base: si falla, la caché no queda con un usuario que no sobreviviría al reinicio
+        await db_async.guardar_usuario_autorizado(user_id, aprobado_por)
         USUARIOS_AUTORIZADOS.add(user_id)
-        # Nota: En un sistema de producción, estos cambios deberían guardarse
-        # en un archivo JSON o en la base de datos para persistencia.
-        print(f"DEBUG: Usuario {user_id} autorizado. Autorizados actuales: {USUARIOS_AUTORIZADOS}")
-        
-def remover_usuario_autorizado(user_id: int):
-    """Remueve un usuario del conjunto de autorizados."""
+        logger.info("Usuario %s autorizado por %s. Autorizados actuales: %d",
+                    user_id, aprobado_por, len(USUARIOS_AUTORIZADOS))
+
+async def remover_usuario_autorizado(user_id: int):
+    """Remueve un usuario del conjunto de autorizados y de la base."""
+    await db_async.eliminar_usuario_autorizado(user_id)
     if user_id in USUARIOS_AUTORIZADOS:
         USUARIOS_AUTORIZADOS.remove(user_id)
-        print(f"DEBUG: Usuario {user_id} removido. Autorizados actuales: {USUARIOS_AUTORIZADOS}")
\ No newline at end of file
+        logger.info("Usuario %s removido. Autorizados actuales: %d", user_id, len(USUARIOS_AUTORIZADOS))
\ No newline at end of file
@@ -1,102 +1,753 @@
 # database.py
+import itertools
+import logging
+import math
+import os
+import queue
 import sqlite3
-import pandas as pd
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 DB_NAME = "kamadata.db"
 
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
+# Cantidad máxima de conexiones de lectura abiertas (reportes en paralelo).
+DB_LECTORES = 3
+
+# PRAGMAs aplicados a cada conexión. WAL permite que los reportes lean mientras se inserta.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA cache_size=-16000",    # ~16 MB
+    "PRAGMA temp_store=MEMORY",
+)
+
+def _conectar(db_name: str, solo_lectura: bool = False):
+    conn = sqlite3.connect(db_name, timeout=30, check_same_thread=False)
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    if solo_lectura:
+        conn.execute("PRAGMA query_only=ON")
+    else:
+        # fsync en cada commit: "✅ Registro guardado." se responde después del commit y un corte de luz
+        # no debe perder lo confirmado. Con el commit agrupado de db_async es un fsync por grupo.
+        conn.execute("PRAGMA synchronous=FULL")
+    return conn
+
+class _PoolConexiones:
+    """Una conexión de escritura (serializada con un lock) y un pequeño pool de lectura."""
+
+    def __init__(self, db_name: str, max_lectores: int):
+        self.db_name = db_name
+        self.pid = os.getpid()
+        self._max_lectores = max_lectores
+        self._lectores_creados = 0
+        self._libres = queue.LifoQueue()
+        self._todos = []
+        self._lock_escritor = threading.Lock()
+        self._lock_lectores = threading.Lock()
+        self._escritor = _conectar(db_name)
+        self._todos.append(self._escritor)
+        # (tabla, nombre) -> id de las etiquetas de produccion (ver _ids_etiquetas)
+        self.etiquetas = {}
+
+    @contextmanager
+    def escritura(self):
+        # 'with conn' hace commit al salir o rollback si hubo excepción
+        with self._lock_escritor, self._escritor:
+            yield self._escritor.cursor()
+
+    @contextmanager
+    def lectura(self):
+        conn = self._tomar_lector()
+        try:
+            yield conn.cursor()
+        finally:
+            conn.rollback()  # cierra la transacción de lectura implícita, si la hubo
+            self._libres.put(conn)
+
+    def _tomar_lector(self):
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock_lectores:
+            if self._lectores_creados < self._max_lectores:
+                self._lectores_creados += 1
+                conn = _conectar(self.db_name, solo_lectura=True)
+                self._todos.append(conn)
+                return conn
+        return self._libres.get()
+
+    def cerrar(self):
+        for conn in self._todos:
+            conn.close()
+        self._todos.clear()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _obtener_pool():
+    """Devuelve el pool del proceso actual, creándolo si hace falta (o si cambió DB_NAME)."""
+    global _pool
+    pool = _pool
+    if pool is not None and pool.db_name == DB_NAME and pool.pid == os.getpid():
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.db_name != DB_NAME or _pool.pid != os.getpid():
+            # Las conexiones heredadas de otro proceso (fork) no se deben reutilizar ni cerrar
+            if _pool is not None and _pool.pid == os.getpid():
+                _pool.cerrar()
+            _pool = _PoolConexiones(DB_NAME, DB_LECTORES)
+        return _pool
+
+@contextmanager
+def _escritura():
+    with _obtener_pool().escritura() as cur:
+        yield cur
+
+@contextmanager
+def _lectura():
+    with _obtener_pool().lectura() as cur:
+        yield cur
+
+def cerrar_conexiones():
+    """Cierra las conexiones del pool (llamar al apagar el bot)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.cerrar()
+        _pool = None
+
+# Índices para los reportes por fecha y por periodo: (fecha, area_id, empresa_id) cubre el WHERE
+# y el ORDER BY sin ordenar en memoria; trabajador_id sirve al JOIN y a las consultas por trabajador.
+# CREATE INDEX IF NOT EXISTS es idempotente, así que se aplica en cada arranque sobre bases existentes.
+_INDICES = (
+    "CREATE INDEX IF NOT EXISTS idx_produccion_fecha_area_empresa ON produccion (fecha, area_id, empresa_id)",
+    "CREATE INDEX IF NOT EXISTS idx_produccion_trabajador ON produccion (trabajador_id)",
+)
+
+# Tablas cuyos cambios afectan a los reportes
+_TABLAS_VERSIONADAS = ("produccion", "trabajadores")
+
+def _crear_indices(cur):
+    for sql in _INDICES:
+        cur.execute(sql)
+
+# Acumulado diario de produccion (fecha, area, empresa, tipo, proveedor, trabajador): los reportes
+# por periodo leen de aquí y su costo depende de los días del rango, no de la cantidad de registros.
+# Se mantiene con triggers, en la misma transacción que cada INSERT/UPDATE/DELETE de produccion.
+# tipo_id, proveedor_id y trabajador_id se guardan como 0 cuando son NULL para que formen parte de la clave.
+_SQL_DIARIA_DESDE_PRODUCCION = """
+    SELECT fecha, area_id, empresa_id, COALESCE(tipo_id, 0), COALESCE(proveedor_id, 0),
+           COALESCE(trabajador_id, 0), SUM(cantidad_centesimas), COUNT(*)
+    FROM produccion
+    GROUP BY fecha, area_id, empresa_id, COALESCE(tipo_id, 0), COALESCE(proveedor_id, 0),
+             COALESCE(trabajador_id, 0)
+"""
+
+_TRIGGERS_DIARIA = (
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_produccion_insert_diaria AFTER INSERT ON produccion BEGIN
+        INSERT INTO produccion_diaria (fecha, area_id, empresa_id, tipo_id, proveedor_id, trabajador_id,
+                                       cantidad_centesimas, registros)
+        VALUES (new.fecha, new.area_id, new.empresa_id, COALESCE(new.tipo_id, 0), COALESCE(new.proveedor_id, 0),
+                COALESCE(new.trabajador_id, 0), new.cantidad_centesimas, 1)
+        ON CONFLICT (fecha, area_id, empresa_id, tipo_id, proveedor_id, trabajador_id)
+        DO UPDATE SET cantidad_centesimas = cantidad_centesimas + excluded.cantidad_centesimas,
+                      registros = registros + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_produccion_delete_diaria AFTER DELETE ON produccion BEGIN
+        UPDATE produccion_diaria SET cantidad_centesimas = cantidad_centesimas - old.cantidad_centesimas,
+                                     registros = registros - 1
+        WHERE fecha = old.fecha AND area_id = old.area_id AND empresa_id = old.empresa_id
+          AND tipo_id = COALESCE(old.tipo_id, 0) AND proveedor_id = COALESCE(old.proveedor_id, 0)
+          AND trabajador_id = COALESCE(old.trabajador_id, 0);
+        DELETE FROM produccion_diaria
+        WHERE fecha = old.fecha AND area_id = old.area_id AND empresa_id = old.empresa_id
+          AND tipo_id = COALESCE(old.tipo_id, 0) AND proveedor_id = COALESCE(old.proveedor_id, 0)
+          AND trabajador_id = COALESCE(old.trabajador_id, 0)
+          AND registros <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_produccion_update_diaria AFTER UPDATE ON produccion BEGIN
+        UPDATE produccion_diaria SET cantidad_centesimas = cantidad_centesimas - old.cantidad_centesimas,
+                                     registros = registros - 1
+        WHERE fecha = old.fecha AND area_id = old.area_id AND empresa_id = old.empresa_id
+          AND tipo_id = COALESCE(old.tipo_id, 0) AND proveedor_id = COALESCE(old.proveedor_id, 0)
+          AND trabajador_id = COALESCE(old.trabajador_id, 0);
+        DELETE FROM produccion_diaria
+        WHERE fecha = old.fecha AND area_id = old.area_id AND empresa_id = old.empresa_id
+          AND tipo_id = COALESCE(old.tipo_id, 0) AND proveedor_id = COALESCE(old.proveedor_id, 0)
+          AND trabajador_id = COALESCE(old.trabajador_id, 0)
+          AND registros <= 0;
+        INSERT INTO produccion_diaria (fecha, area_id, empresa_id, tipo_id, proveedor_id, trabajador_id,
+                                       cantidad_centesimas, registros)
+        VALUES (new.fecha, new.area_id, new.empresa_id, COALESCE(new.tipo_id, 0), COALESCE(new.proveedor_id, 0),
+                COALESCE(new.trabajador_id, 0), new.cantidad_centesimas, 1)
+        ON CONFLICT (fecha, area_id, empresa_id, tipo_id, proveedor_id, trabajador_id)
+        DO UPDATE SET cantidad_centesimas = cantidad_centesimas + excluded.cantidad_centesimas,
+                      registros = registros + 1;
+    END
+    """,
+)
+
+def _crear_produccion_diaria(cur):
+    existia = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'produccion_diaria'"
+    ).fetchone()
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS trabajadores (
-            id INTEGER PRIMARY KEY,
-            nombre TEXT NOT NULL
-        )
+        CREATE TABLE IF NOT EXISTS produccion_diaria (
+            fecha TEXT NOT NULL,
+            area_id INTEGER NOT NULL,
+            empresa_id INTEGER NOT NULL,
+            tipo_id INTEGER NOT NULL DEFAULT 0,
+            proveedor_id INTEGER NOT NULL DEFAULT 0,
+            trabajador_id INTEGER NOT NULL DEFAULT 0,
+            cantidad_centesimas INTEGER NOT NULL,
+            registros INTEGER NOT NULL,
+            PRIMARY KEY (fecha, area_id, empresa_id, tipo_id, proveedor_id, trabajador_id)
+        ) WITHOUT ROWID
     """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS produccion (
+    for sql in _TRIGGERS_DIARIA:
+        cur.execute(sql)
+    if not existia:
+        # Primera vez sobre una base existente: se carga el histórico
+        cur.execute("INSERT INTO produccion_diaria " + _SQL_DIARIA_DESDE_PRODUCCION)
+
+def reconstruir_produccion_diaria():
+    """Recalcula produccion_diaria desde produccion. Devuelve la cantidad de filas acumuladas."""
+    with _escritura() as cur:
+        cur.execute("DELETE FROM produccion_diaria")
+        cur.execute("INSERT INTO produccion_diaria " + _SQL_DIARIA_DESDE_PRODUCCION)
+        return cur.rowcount
+
+def verificar_produccion_diaria():
+    """Compara produccion_diaria con produccion. Devuelve las claves que no coinciden (vacío si todo está bien)."""
+    with _lectura() as cur:
+        # Las cantidades son enteras: la comparación es exacta, sin importar el orden de las sumas
+        cur.execute("""
+            WITH esperado AS (""" + _SQL_DIARIA_DESDE_PRODUCCION + """
+            ), actual AS (
+                SELECT fecha, area_id, empresa_id, tipo_id, proveedor_id, trabajador_id,
+                       cantidad_centesimas, registros
+                FROM produccion_diaria
+            )
+            SELECT * FROM (SELECT * FROM esperado EXCEPT SELECT * FROM actual)
+            UNION
+            SELECT * FROM (SELECT * FROM actual EXCEPT SELECT * FROM esperado)
+        """)
+        return sorted({fila[:6] for fila in cur.fetchall()})
+
+# Cantidades en punto fijo: produccion guarda centésimas (kg de Sardina, cajas de Línea con
+# decimales, cestas, cajas) como enteros, así las sumas de los reportes son exactas y enteras.
+ESCALA_CANTIDAD = 100
+
+def a_centesimas(cantidad) -> int:
+    """Cantidad en centésimas, redondeada al entero más cercano igual que ROUND() de SQLite."""
+    if not math.isfinite(cantidad):
+        raise ValueError(f"Cantidad no válida: {cantidad}")
+    centesimas = float(cantidad) * ESCALA_CANTIDAD
+    return int(centesimas + 0.5) if centesimas >= 0 else int(centesimas - 0.5)
+
+# Etiquetas (diccionarios): produccion guarda el id de su área, empresa, tipo y proveedor en lugar
+# del texto, así cada fila y cada clave de produccion_diaria ocupan unos pocos bytes.
+ETIQUETAS = ("areas", "empresas", "tipos", "proveedores")
+# En Sardina, el tipo de las cargas es el proveedor (texto libre); en las demás áreas, el tipo de producto
+AREA_CON_PROVEEDOR = "Sardina"
+
+def _ids_etiquetas(cur, filas):
+    """Convierte (fecha, area, empresa, tipo, ...) en (fecha, area_id, empresa_id, tipo_id, proveedor_id, ...).
+
+    Las etiquetas nuevas se agregan en la transacción de 'cur'. Devuelve (filas, ids nuevos), y los
+    nuevos se pasan a la caché del pool sólo después del commit: si se deshace, esos ids no existen.
+    """
+    cache = _obtener_pool().etiquetas
+    nuevos = {}
+
+    def id_(tabla, nombre):
+        if nombre is None:
+            return None
+        clave = (tabla, nombre)
+        valor = cache.get(clave) or nuevos.get(clave)
+        if valor is None:
+            cur.execute(f"INSERT INTO {tabla} (nombre) VALUES (?) ON CONFLICT (nombre) DO NOTHING", (nombre,))
+            valor = nuevos[clave] = cur.execute(f"SELECT id FROM {tabla} WHERE nombre = ?", (nombre,)).fetchone()[0]
+        return valor
+
+    filas = [(f, id_("areas", a), id_("empresas", e),
+              None if a == AREA_CON_PROVEEDOR else id_("tipos", t),
+              id_("proveedores", t) if a == AREA_CON_PROVEEDOR else None, *resto)
+             for f, a, e, t, *resto in filas]
+    return filas, nuevos
+
+# Cantidad de una fila de produccion en sus unidades: entera si no tiene decimales (como se cargó)
+_SQL_CANTIDAD = f"""CASE WHEN p.cantidad_centesimas % {ESCALA_CANTIDAD} = 0
+                         THEN p.cantidad_centesimas / {ESCALA_CANTIDAD}
+                         ELSE p.cantidad_centesimas / {ESCALA_CANTIDAD}.0 END"""
+
+# Detalle de produccion con el texto de cada etiqueta (el tipo de Sardina es su proveedor). Con
+# LEFT JOIN produccion es siempre la tabla exterior, así el orden por (fecha, area_id, empresa_id)
+# sale del índice y el detalle de un periodo se puede recorrer sin ordenarlo en memoria.
+_SQL_REGISTROS = f"""
+    SELECT p.fecha, a.nombre, e.nombre, COALESCE(ti.nombre, pr.nombre), {_SQL_CANTIDAD},
+           p.trabajador_id, t.nombre
+    FROM produccion p
+    LEFT JOIN areas a ON a.id = p.area_id
+    LEFT JOIN empresas e ON e.id = p.empresa_id
+    LEFT JOIN tipos ti ON ti.id = p.tipo_id
+    LEFT JOIN proveedores pr ON pr.id = p.proveedor_id
+    LEFT JOIN trabajadores t ON p.trabajador_id = t.id
+"""
+
+# Filtro opcional por empresa (por nombre) sobre una columna empresa_id; parámetros (empresa, empresa)
+_SQL_FILTRO_EMPRESA = "(? IS NULL OR {columna} = (SELECT id FROM empresas WHERE nombre = ?))"
+
+# --- migraciones ---
+# PRAGMA user_version guarda la versión del esquema: _MIGRACIONES[i] lleva la base de la versión i
+# a la i + 1. init_db aplica al arrancar las que falten, en orden, antes de que el bot atienda updates.
+# Filas de produccion copiadas por transacción al reconstruir la tabla
+BLOQUE_MIGRACION = 50_000
+
+def _reconstruir_produccion(version: int, crear_sql: str, columnas: str, select_sql: str):
+    """Copia produccion a produccion_nueva por bloques de id y reemplaza una tabla por la otra.
+
+    Cada bloque es una transacción corta; si el proceso se interrumpe, la próxima vez la copia sigue
+    desde el último bloque guardado. El reemplazo y el nuevo user_version se confirman juntos.
+    """
+    with _escritura() as cur:
+        cur.execute(crear_sql)
+        copiado = cur.execute("SELECT COALESCE(MAX(id), 0) FROM produccion_nueva").fetchone()[0]
+        ultimo = cur.execute("SELECT COALESCE(MAX(id), 0) FROM produccion").fetchone()[0]
+    if copiado:
+        logger.info("Continuando la copia de produccion desde el id %d", copiado)
+    while copiado < ultimo:
+        hasta = copiado + BLOQUE_MIGRACION
+        with _escritura() as cur:
+            cur.execute(f"INSERT INTO produccion_nueva ({columnas}) {select_sql} "
+                        "WHERE produccion.id > ? AND produccion.id <= ?", (copiado, hasta))
+        copiado = hasta
+    with _escritura() as cur:
+        cur.execute("BEGIN IMMEDIATE")
+        # AUTOINCREMENT: la tabla nueva sigue el contador de la vieja, así los ids de registros
+        # borrados tampoco se reutilizan
+        cur.execute("DELETE FROM sqlite_sequence WHERE name = 'produccion_nueva'")
+        cur.execute("UPDATE sqlite_sequence SET name = 'produccion_nueva' WHERE name = 'produccion'")
+        cur.execute("DROP TABLE produccion")
+        cur.execute("ALTER TABLE produccion_nueva RENAME TO produccion")
+        # Los reportes en caché se generaron con la tabla anterior
+        cur.execute("UPDATE versiones SET version = version + 1 WHERE tabla = 'produccion'")
+        cur.execute(f"PRAGMA user_version = {version}")
+
+def _eliminar_produccion_diaria():
+    # init_db la vuelve a crear y cargar desde produccion, con el esquema nuevo
+    with _escritura() as cur:
+        for evento in ("insert", "update", "delete"):
+            cur.execute(f"DROP TRIGGER IF EXISTS trg_produccion_{evento}_diaria")
+        cur.execute("DROP TABLE IF EXISTS produccion_diaria")
+
+def _migracion_cantidad_fija(version: int):
+    """cantidad (REAL o INTEGER según lo que se guardó) pasa a cantidad_centesimas INTEGER, y se
+    agrega cantidad_auxiliar (cestas de Sardina), que agregar_registro recibía pero no guardaba."""
+    # Los handlers ahora aceptan hasta 2 decimales; lo cargado antes con más se redondea y queda en el log
+    with _lectura() as cur:
+        redondeadas = cur.execute(f"""
+            SELECT id, cantidad FROM produccion
+            WHERE ABS(cantidad * {ESCALA_CANTIDAD} - ROUND(cantidad * {ESCALA_CANTIDAD})) > 1e-6
+        """).fetchall()
+    if redondeadas:
+        logger.warning("%d registros tienen más de 2 decimales y se redondean a centésimas (id, cantidad): %s%s",
+                       len(redondeadas), redondeadas[:20], " …" if len(redondeadas) > 20 else "")
+    _eliminar_produccion_diaria()
+    _reconstruir_produccion(version, """
+        CREATE TABLE IF NOT EXISTS produccion_nueva (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             fecha TEXT NOT NULL,
             area TEXT NOT NULL,
             empresa TEXT NOT NULL,
             tipo TEXT,
-            cantidad INTEGER NOT NULL,
+            cantidad_centesimas INTEGER NOT NULL,
+            cantidad_auxiliar INTEGER,
             trabajador_id INTEGER,
             responsable_id INTEGER,
             FOREIGN KEY(trabajador_id) REFERENCES trabajadores(id)
         )
-    """)
-    conn.commit()
-    conn.close()
+    """, "id, fecha, area, empresa, tipo, cantidad_centesimas, trabajador_id, responsable_id",
+        f"""SELECT id, fecha, area, empresa, tipo, CAST(ROUND(cantidad * {ESCALA_CANTIDAD}) AS INTEGER),
+                   trabajador_id, responsable_id
+            FROM produccion""")
+
+def _migracion_etiquetas(version: int):
+    """area, empresa y tipo pasan de texto repetido en cada fila a ids de las tablas de etiquetas;
+    el tipo de Sardina (el proveedor, texto libre) va a proveedor_id."""
+    _eliminar_produccion_diaria()
+    with _escritura() as cur:
+        for tabla in ETIQUETAS:
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {tabla} (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL UNIQUE)")
+        # Ids en orden alfabético: el detalle de los reportes, ordenado por area_id y empresa_id,
+        # queda en el mismo orden que antes para los datos existentes
+        for tabla, columna, filtro in (
+            ("areas", "area", ""),
+            ("empresas", "empresa", ""),
+            ("tipos", "tipo", f"AND area <> '{AREA_CON_PROVEEDOR}'"),
+            ("proveedores", "tipo", f"AND area = '{AREA_CON_PROVEEDOR}'"),
+        ):
+            cur.execute(f"""
+                INSERT OR IGNORE INTO {tabla} (nombre)
+                SELECT DISTINCT {columna} FROM produccion WHERE {columna} IS NOT NULL {filtro} ORDER BY {columna}
+            """)
+    _reconstruir_produccion(version, """
+        CREATE TABLE IF NOT EXISTS produccion_nueva (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL,
+            area_id INTEGER NOT NULL REFERENCES areas(id),
+            empresa_id INTEGER NOT NULL REFERENCES empresas(id),
+            tipo_id INTEGER REFERENCES tipos(id),
+            proveedor_id INTEGER REFERENCES proveedores(id),
+            cantidad_centesimas INTEGER NOT NULL,
+            cantidad_auxiliar INTEGER,
+            trabajador_id INTEGER,
+            responsable_id INTEGER,
+            FOREIGN KEY(trabajador_id) REFERENCES trabajadores(id)
+        )
+    """, "id, fecha, area_id, empresa_id, tipo_id, proveedor_id, cantidad_centesimas, cantidad_auxiliar, "
+         "trabajador_id, responsable_id",
+        f"""SELECT produccion.id, fecha, a.id, e.id, ti.id, pr.id, cantidad_centesimas, cantidad_auxiliar,
+                   trabajador_id, responsable_id
+            FROM produccion
+            JOIN areas a ON a.nombre = produccion.area
+            JOIN empresas e ON e.nombre = produccion.empresa
+            LEFT JOIN tipos ti ON ti.nombre = produccion.tipo AND produccion.area <> '{AREA_CON_PROVEEDOR}'
+            LEFT JOIN proveedores pr ON pr.nombre = produccion.tipo AND produccion.area = '{AREA_CON_PROVEEDOR}'""")
+
+_MIGRACIONES = (
+    _migracion_cantidad_fija,
+    _migracion_etiquetas,
+)
+
+def _migrar():
+    with _escritura() as cur:
+        actual = cur.execute("PRAGMA user_version").fetchone()[0]
+    for version, migracion in enumerate(_MIGRACIONES[actual:], start=actual + 1):
+        t0 = time.perf_counter()
+        logger.info("Migrando la base a la versión %d (%s)", version, migracion.__name__)
+        migracion(version)
+        logger.info("Base en la versión %d en %.1f s", version, time.perf_counter() - t0)
+
+def _crear_triggers_version(cur):
+    for tabla in _TABLAS_VERSIONADAS:
+        cur.execute("INSERT OR IGNORE INTO versiones (tabla, version) VALUES (?, 0)", (tabla,))
+        for evento in ("INSERT", "UPDATE", "DELETE"):
+            cur.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{tabla}_{evento.lower()}_version
+                AFTER {evento} ON {tabla} BEGIN
+                    UPDATE versiones SET version = version + 1 WHERE tabla = '{tabla}';
+                END
+            """)
+
+def init_db():
+    # Esquema original (versión 0): las bases nuevas también pasan por _MIGRACIONES
+    with _escritura() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS trabajadores (
+                id INTEGER PRIMARY KEY,
+                nombre TEXT NOT NULL
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS produccion (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fecha TEXT NOT NULL,
+                area TEXT NOT NULL,
+                empresa TEXT NOT NULL,
+                tipo TEXT,
+                cantidad INTEGER NOT NULL,
+                trabajador_id INTEGER,
+                responsable_id INTEGER,
+                FOREIGN KEY(trabajador_id) REFERENCES trabajadores(id)
+            )
+        """)
+        # Contadores de cambios por tabla: los triggers los incrementan en cada escritura, así
+        # cualquier camino (registros, lotes, cargas, ediciones manuales) invalida la caché de reportes.
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS versiones (
+                tabla TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Usuarios autorizados por un administrador: sobreviven a los reinicios del bot
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS usuarios_autorizados (
+                user_id INTEGER PRIMARY KEY,
+                aprobado_por INTEGER,
+                fecha_aprobacion TEXT NOT NULL
+            )
+        """)
+        # Persistencia del bot (persistencia.py): user_data/chat_data y estados de conversación
+        # serializados con pickle, para retomar las cargas a medias después de un reinicio
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS sesiones (
+                tipo TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                datos BLOB NOT NULL,
+                PRIMARY KEY (tipo, id)
+            ) WITHOUT ROWID
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS conversaciones (
+                nombre TEXT NOT NULL,
+                clave TEXT NOT NULL,
+                estado BLOB NOT NULL,
+                PRIMARY KEY (nombre, clave)
+            ) WITHOUT ROWID
+        """)
+    _migrar()
+    # Lo que depende de la versión actual de produccion (una reconstrucción lo elimina con la tabla)
+    with _escritura() as cur:
+        _crear_triggers_version(cur)
+        _crear_produccion_diaria(cur)
+        _crear_indices(cur)
+        # Actualiza las estadísticas del planificador si hace falta (barato cuando no hay cambios)
+        cur.execute("PRAGMA optimize")
 
 # trabajadores
 def upsert_trabajador(trabajador_id: int, nombre: str):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO trabajadores (id, nombre) VALUES (?, ?)
-        ON CONFLICT(id) DO UPDATE SET nombre=excluded.nombre
-    """, (trabajador_id, nombre))
-    conn.commit()
-    conn.close()
+    with _escritura() as cur:
+        cur.execute("""
+            INSERT INTO trabajadores (id, nombre) VALUES (?, ?)
+            ON CONFLICT(id) DO UPDATE SET nombre=excluded.nombre
+        """, (trabajador_id, nombre))
+
+def upsert_trabajadores_lote(filas):
+    """Inserta o actualiza (id, nombre) en una sola transacción.
+
+    'filas' puede ser un generador: se consume en streaming dentro del executemany.
+    Devuelve (insertados, actualizados).
+    """
+    with _escritura() as cur:
+        antes = cur.execute("SELECT COUNT(*) FROM trabajadores").fetchone()[0]
+        cur.executemany("""
+            INSERT INTO trabajadores (id, nombre) VALUES (?, ?)
+            ON CONFLICT(id) DO UPDATE SET nombre=excluded.nombre
+        """, filas)
+        procesados = max(cur.rowcount, 0)
+        despues = cur.execute("SELECT COUNT(*) FROM trabajadores").fetchone()[0]
+    insertados = despues - antes
+    return insertados, procesados - insertados
 
 def listar_trabajadores():
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    cur.execute("SELECT id, nombre FROM trabajadores ORDER BY nombre")
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    with _lectura() as cur:
+        cur.execute("SELECT id, nombre FROM trabajadores ORDER BY nombre")
+        return cur.fetchall()
+
+# usuarios autorizados
+def guardar_usuario_autorizado(user_id: int, aprobado_por: int = None):
+    with _escritura() as cur:
+        cur.execute("""
+            INSERT INTO usuarios_autorizados (user_id, aprobado_por, fecha_aprobacion) VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET aprobado_por=excluded.aprobado_por,
+                                               fecha_aprobacion=excluded.fecha_aprobacion
+        """, (user_id, aprobado_por, datetime.now().isoformat(timespec="seconds")))
+
+def eliminar_usuario_autorizado(user_id: int):
+    with _escritura() as cur:
+        cur.execute("DELETE FROM usuarios_autorizados WHERE user_id = ?", (user_id,))
+
+def listar_usuarios_autorizados():
+    """Devuelve [(user_id, aprobado_por, fecha_aprobacion)]."""
+    with _lectura() as cur:
+        cur.execute("SELECT user_id, aprobado_por, fecha_aprobacion FROM usuarios_autorizados ORDER BY user_id")
+        return cur.fetchall()
+
+# persistencia del bot
+def leer_sesiones(tipo: str):
+    """Devuelve [(id, datos)] de las sesiones guardadas de un tipo ('user' o 'chat')."""
+    with _lectura() as cur:
+        cur.execute("SELECT id, datos FROM sesiones WHERE tipo = ?", (tipo,))
+        return cur.fetchall()
+
+def leer_conversaciones(nombre: str):
+    """Devuelve [(clave, estado)] de las conversaciones guardadas de un ConversationHandler."""
+    with _lectura() as cur:
+        cur.execute("SELECT clave, estado FROM conversaciones WHERE nombre = ?", (nombre,))
+        return cur.fetchall()
+
+def guardar_persistencia(sesiones, conversaciones):
+    """Aplica en una sola transacción los cambios pendientes de la persistencia.
+
+    sesiones: {(tipo, id): datos o None}; conversaciones: {(nombre, clave): estado o None}.
+    None borra la fila.
+    """
+    with _escritura() as cur:
+        cur.executemany("""
+            INSERT INTO sesiones (tipo, id, datos) VALUES (?, ?, ?)
+            ON CONFLICT(tipo, id) DO UPDATE SET datos=excluded.datos
+        """, ((t, i, d) for (t, i), d in sesiones.items() if d is not None))
+        cur.executemany("DELETE FROM sesiones WHERE tipo = ? AND id = ?",
+                        (k for k, d in sesiones.items() if d is None))
+        cur.executemany("""
+            INSERT INTO conversaciones (nombre, clave, estado) VALUES (?, ?, ?)
+            ON CONFLICT(nombre, clave) DO UPDATE SET estado=excluded.estado
+        """, ((n, c, e) for (n, c), e in conversaciones.items() if e is not None))
+        cur.executemany("DELETE FROM conversaciones WHERE nombre = ? AND clave = ?",
+                        (k for k, e in conversaciones.items() if e is None))
 
 # produccion
 def agregar_registro(trabajador_id: int, area: str, empresa: str, cantidad: float, 
                      responsable_id: int, cantidad_auxiliar: int = None,
                      tipo: str = None, fecha: str = None):
-    if fecha is None:
-        fecha = datetime.now().strftime("%Y-%m-%d")
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    
-    # Importante: Si la tabla 'produccion' no tiene la columna 'cantidad_auxiliar', esta función fallará
-    # a menos que la retire de la lista de columnas y valores.
-    # Asumiré la estructura definida anteriormente:
-    cur.execute("""
-        INSERT INTO produccion (fecha, area, empresa, tipo, cantidad, trabajador_id, responsable_id)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (fecha, area, empresa, tipo, cantidad, trabajador_id, responsable_id))
-    
-    conn.commit()
-    conn.close()
+    return agregar_cargas(area, [(fecha, empresa, tipo, [trabajador_id], cantidad)], responsable_id,
+                          cantidad_auxiliar)
+
+def agregar_registros_lote(trabajador_ids, area: str, empresa: str, cantidad: float,
+                           responsable_id: int, tipo: str = None, fecha: str = None):
+    """Registra la misma producción para varios trabajadores en una sola transacción (todo o nada)."""
+    return agregar_cargas(area, [(fecha, empresa, tipo, trabajador_ids, cantidad)], responsable_id)
+
+def filas_cargas(area: str, cargas, responsable_id: int, cantidad_auxiliar: int = None):
+    """Filas de produccion de las cargas [(fecha, empresa, tipo, trabajador_ids, cantidad)], una por trabajador.
+
+    Una carga con fecha None queda con la fecha de hoy.
+    """
+    hoy = datetime.now().strftime("%Y-%m-%d")
+    return [(fecha or hoy, area, empresa, tipo, cantidad, tid, responsable_id, cantidad_auxiliar)
+            for fecha, empresa, tipo, trabajador_ids, cantidad in cargas for tid in trabajador_ids]
+
+def agregar_cargas(area: str, cargas, responsable_id: int, cantidad_auxiliar: int = None):
+    """Registra varias cargas [(fecha, empresa, tipo, trabajador_ids, cantidad)] en una sola transacción.
+
+    Devuelve la cantidad de registros insertados (uno por trabajador de cada carga).
+    """
+    return insertar_registros(filas_cargas(area, cargas, responsable_id, cantidad_auxiliar))
+
+def insertar_registros(filas):
+    """Inserta filas (fecha, area, empresa, tipo, cantidad, trabajador_id, responsable_id, cantidad_auxiliar)
+    en una transacción. La cantidad va en sus unidades (kg, cajas, cestas) y se guarda en centésimas."""
+    filas = [(f, a, e, t, a_centesimas(c), tid, rid, aux) for f, a, e, t, c, tid, rid, aux in filas]
+    with _escritura() as cur:
+        filas, nuevos = _ids_etiquetas(cur, filas)
+        cur.executemany("""
+            INSERT INTO produccion (fecha, area_id, empresa_id, tipo_id, proveedor_id, cantidad_centesimas,
+                                    trabajador_id, responsable_id, cantidad_auxiliar)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, filas)
+    _obtener_pool().etiquetas.update(nuevos)
+    return len(filas)
+
+def obtener_version_datos() -> int:
+    """Número que cambia con cada escritura en produccion o trabajadores (clave de la caché de reportes)."""
+    with _lectura() as cur:
+        return cur.execute("SELECT COALESCE(SUM(version), 0) FROM versiones").fetchone()[0]
 
 # Reporte 1: Registros por fecha (CORREGIDO)
-def obtener_registros_por_fecha(fecha: str):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT p.fecha, p.area, p.empresa, p.tipo, p.cantidad,
-               p.trabajador_id, t.nombre
-        FROM produccion p
-        LEFT JOIN trabajadores t ON p.trabajador_id = t.id
-        WHERE p.fecha = ?
-        ORDER BY p.area, p.empresa
-    """, (fecha,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+def obtener_registros_por_fecha(fecha: str, empresa: str = None):
+    with _lectura() as cur:
+        cur.execute(_SQL_REGISTROS + f"""
+            WHERE p.fecha = ? AND {_SQL_FILTRO_EMPRESA.format(columna="p.empresa_id")}
+            ORDER BY p.area_id, p.empresa_id
+        """, (fecha, empresa, empresa))
+        return cur.fetchall()
 
 # Reporte 2: Registros por periodo (CORREGIDO)
-def obtener_registros_periodo(fecha_inicio: str, fecha_fin: str):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT p.fecha, p.area, p.empresa, p.tipo, p.cantidad,
-               p.trabajador_id, t.nombre
-        FROM produccion p
-        LEFT JOIN trabajadores t ON p.trabajador_id = t.id
-        WHERE p.fecha BETWEEN ? AND ?
-        ORDER BY p.fecha, p.area, p.empresa
-    """, (fecha_inicio, fecha_fin))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
\ No newline at end of file
+def obtener_registros_periodo(fecha_inicio: str, fecha_fin: str, empresa: str = None):
+    with _lectura() as cur:
+        cur.execute(_SQL_REGISTROS + f"""
+            WHERE p.fecha BETWEEN ? AND ? AND {_SQL_FILTRO_EMPRESA.format(columna="p.empresa_id")}
+            ORDER BY p.fecha, p.area_id, p.empresa_id
+        """, (fecha_inicio, fecha_fin, empresa, empresa))
+        return cur.fetchall()
+
+def iterar_registros_periodo(fecha_inicio: str, fecha_fin: str, empresa: str = None, tamano: int = 5000):
+    """Igual que obtener_registros_periodo, pero entrega las filas por bloques (fetchmany).
+
+    La memoria usada no depende de la cantidad de registros del periodo.
+    """
+    with _lectura() as cur:
+        cur.execute(_SQL_REGISTROS + f"""
+            WHERE p.fecha BETWEEN ? AND ? AND {_SQL_FILTRO_EMPRESA.format(columna="p.empresa_id")}
+            ORDER BY p.fecha, p.area_id, p.empresa_id
+        """, (fecha_inicio, fecha_fin, empresa, empresa))
+        while True:
+            bloque = cur.fetchmany(tamano)
+            if not bloque:
+                return
+            yield from bloque
+
+# Reportes agregados: GROUP BY en SQLite sobre produccion_diaria, así ni el tamaño ni el costo
+# del reporte crecen con la cantidad de registros
+def obtener_totales_por_area(fecha_inicio: str, fecha_fin: str, empresa: str = None):
+    """Totales por área, empresa y tipo, con un subtotal por área y el total general al final.
+
+    Filas: (area, empresa, tipo, cantidad, registros). El total general lleva sólo los registros:
+    cada área mide en su unidad (kg, cajas, cestas) y su suma no tiene sentido.
+    """
+    with _lectura() as cur:
+        # Se agrupa por ids y sólo las filas ya agrupadas se unen con los textos de las etiquetas
+        grupos = cur.execute(f"""
+            SELECT a.nombre, e.nombre, COALESCE(ti.nombre, pr.nombre, ''), g.cantidad, g.registros
+            FROM (
+                SELECT area_id, empresa_id, tipo_id, proveedor_id,
+                       SUM(cantidad_centesimas) AS cantidad, SUM(registros) AS registros
+                FROM produccion_diaria
+                WHERE fecha BETWEEN ? AND ? AND {_SQL_FILTRO_EMPRESA.format(columna="empresa_id")}
+                GROUP BY area_id, empresa_id, tipo_id, proveedor_id
+            ) g
+            JOIN areas a ON a.id = g.area_id
+            JOIN empresas e ON e.id = g.empresa_id
+            LEFT JOIN tipos ti ON ti.id = g.tipo_id
+            LEFT JOIN proveedores pr ON pr.id = g.proveedor_id
+            ORDER BY 1, 2, 3
+        """, (fecha_inicio, fecha_fin, empresa, empresa)).fetchall()
+    # Subtotales en centésimas (enteros); se pasa a unidades sólo al armar cada fila
+    filas = []
+    for area, grupo in itertools.groupby(grupos, key=lambda g: g[0]):
+        grupo = list(grupo)
+        filas.extend(grupo)
+        filas.append((area, "Subtotal", "", sum(g[3] for g in grupo), sum(g[4] for g in grupo)))
+    filas = [(a, e, t, c / ESCALA_CANTIDAD, r) for a, e, t, c, r in filas]
+    if grupos:
+        filas.append(("TOTAL", "", "", "", sum(g[4] for g in grupos)))
+    return filas
+
+def obtener_totales_por_trabajador(fecha_inicio: str, fecha_fin: str, empresa: str = None):
+    """Totales por trabajador y área. Filas: (trabajador_id, nombre, area, cantidad, registros).
+
+    Las filas de produccion con trabajador_id NULL, que los triggers de produccion_diaria guardan como 0 (ver
+    _SQL_DIARIA_DESDE_PRODUCCION), vuelven a salir con trabajador_id None y no como un trabajador 0.
+    """
+    with _lectura() as cur:
+        cur.execute(f"""
+            SELECT NULLIF(g.trabajador_id, 0), t.nombre, a.nombre, g.cantidad, g.registros
+            FROM (
+                SELECT trabajador_id, area_id, SUM(cantidad_centesimas) / {ESCALA_CANTIDAD}.0 AS cantidad,
+                       SUM(registros) AS registros
+                FROM produccion_diaria
+                WHERE fecha BETWEEN ? AND ? AND {_SQL_FILTRO_EMPRESA.format(columna="empresa_id")}
+                GROUP BY area_id, trabajador_id
+            ) g
+            JOIN areas a ON a.id = g.area_id
+            LEFT JOIN trabajadores t ON g.trabajador_id = t.id
+            ORDER BY a.nombre, t.nombre, g.trabajador_id
+        """, (fecha_inicio, fecha_fin, empresa, empresa))
+        return cur.fetchall()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Mantenimiento de la base de datos")
+    parser.add_argument("accion", choices=["reconstruir-diaria", "verificar-diaria"])
+    args = parser.parse_args()
+    init_db()
+    if args.accion == "reconstruir-diaria":
+        print(f"produccion_diaria reconstruida: {reconstruir_produccion_diaria()} filas")
+    else:
+        diferencias = verificar_produccion_diaria()
+        for clave in diferencias:
+            print("Diferencia en", clave)
+        print("produccion_diaria consistente" if not diferencias else f"{len(diferencias)} diferencias")
+        raise SystemExit(1 if diferencias else 0)
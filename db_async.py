@@ -0,0 +1,170 @@
+# db_async.py
+# Acceso a la base desde el event loop: las funciones de database.py son síncronas (una consulta o
+# el commit de una escritura bloquean el hilo que las llama), así que los handlers no las llaman
+# directamente sino con await a través de este módulo, que las corre en hilos dedicados:
+# - escrituras: un único hilo, en orden de llegada. Nunca hay dos transacciones de escritura
+#   compitiendo por el lock de SQLite, así que no aparece "database is locked".
+# - lecturas: DB_LECTORES hilos; con WAL leen en paralelo aunque haya una escritura en curso.
+# Mientras tanto el event loop sigue atendiendo los updates del resto de los usuarios.
+#
+# Los registros de producción que confirman los supervisores se escriben con commit agrupado: cada
+# confirmación se encola y las que llegan juntas se insertan en una sola transacción. El handler
+# espera a que esa transacción termine antes de responder "✅ Registro guardado.".
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+import metricas
+
+# Commit agrupado: un grupo se escribe cuando junta GRUPO_MAX_FILAS filas o pasan GRUPO_ESPERA_MS
+# desde la primera confirmación; las que llegan mientras se escribe forman el grupo siguiente.
+GRUPO_ESPERA_MS = 5
+GRUPO_MAX_FILAS = 2000
+
+_escritor = None
+_lectores = None
+_lock = threading.Lock()
+
+_pendientes = []        # [(filas, futuro)] esperando el próximo grupo
+_filas_pendientes = 0
+_grupo_lleno = None     # asyncio.Event: ya hay GRUPO_MAX_FILAS filas, no hace falta esperar
+_agrupador = None       # tarea que escribe los grupos mientras haya pendientes
+
+def _executors():
+    global _escritor, _lectores
+    if _escritor is None:
+        with _lock:
+            if _escritor is None:
+                _lectores = ThreadPoolExecutor(max_workers=database.DB_LECTORES, thread_name_prefix="db-lectura")
+                _escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-escritura")
+    return _escritor, _lectores
+
+def _cronometrado(fn, args, kwargs):
+    # Corre en el hilo: devuelve también cuándo empezó y terminó, para registrar al volver al loop
+    inicio = time.perf_counter()
+    resultado = fn(*args, **kwargs)
+    return resultado, inicio, time.perf_counter()
+
+async def _ejecutar(executor, modo: str, fn, args, kwargs):
+    encolado = time.perf_counter()
+    resultado, inicio, fin = await asyncio.get_running_loop().run_in_executor(
+        executor, _cronometrado, fn, args, kwargs)
+    metricas.observar("kamada_db_espera_segundos", (modo,), inicio - encolado)
+    metricas.observar("kamada_db_segundos", (fn.__name__, modo), fin - inicio)
+    return resultado
+
+async def escribir(fn, *args, **kwargs):
+    """Ejecuta fn(*args, **kwargs) en el hilo escritor y devuelve su resultado."""
+    escritor, _ = _executors()
+    return await _ejecutar(escritor, "escritura", fn, args, kwargs)
+
+async def leer(fn, *args, **kwargs):
+    """Ejecuta fn(*args, **kwargs) en un hilo de lectura y devuelve su resultado."""
+    _, lectores = _executors()
+    return await _ejecutar(lectores, "lectura", fn, args, kwargs)
+
+async def insertar_agrupado(filas):
+    """Encola filas de produccion para el próximo commit agrupado.
+
+    Termina cuando la transacción que las incluye hizo commit y devuelve cuántas filas se insertaron.
+    """
+    global _filas_pendientes, _agrupador
+    filas = list(filas)
+    loop = asyncio.get_running_loop()
+    futuro = loop.create_future()
+    _pendientes.append((filas, futuro))
+    _filas_pendientes += len(filas)
+    if _agrupador is None or _agrupador.done():
+        _agrupador = loop.create_task(_escribir_grupos())
+    elif _filas_pendientes >= GRUPO_MAX_FILAS and _grupo_lleno is not None:
+        _grupo_lleno.set()
+    return await futuro
+
+async def _escribir_grupos():
+    global _pendientes, _filas_pendientes, _grupo_lleno
+    # Sólo el primer grupo espera a que se junten confirmaciones: los siguientes ya se formaron
+    # mientras se escribía el anterior
+    _grupo_lleno = asyncio.Event()
+    if _filas_pendientes < GRUPO_MAX_FILAS:
+        try:
+            await asyncio.wait_for(_grupo_lleno.wait(), GRUPO_ESPERA_MS / 1000)
+        except asyncio.TimeoutError:
+            pass
+    while _pendientes:
+        grupo, _pendientes, _filas_pendientes = _pendientes, [], 0
+        try:
+            await escribir(database.insertar_registros, [fila for filas, _ in grupo for fila in filas])
+            resultados = [len(filas) for filas, _ in grupo]
+        except Exception:
+            # Se reintenta cada confirmación en su propia transacción: sólo falla la que tiene el problema
+            resultados = []
+            for filas, _ in grupo:
+                try:
+                    resultados.append(await escribir(database.insertar_registros, filas))
+                except Exception as e:
+                    resultados.append(e)
+        for (_, futuro), resultado in zip(grupo, resultados):
+            if futuro.done():
+                continue  # el handler que esperaba se canceló; las filas igual quedaron guardadas
+            if isinstance(resultado, Exception):
+                futuro.set_exception(resultado)
+            else:
+                futuro.set_result(resultado)
+
+async def vaciar():
+    """Espera a que se escriban todas las confirmaciones encoladas (llamar al detener el bot)."""
+    while _agrupador is not None and not _agrupador.done():
+        await _agrupador
+
+def cerrar():
+    """Espera a que terminen las escrituras encoladas y detiene los hilos (llamar al apagar el bot)."""
+    global _escritor, _lectores
+    with _lock:
+        if _escritor is not None:
+            _escritor.shutdown(wait=True)
+            _lectores.shutdown(wait=True)
+        _escritor = _lectores = None
+
+# --- producción (commit agrupado) ---
+async def agregar_registro(trabajador_id: int, area: str, empresa: str, cantidad: float,
+                           responsable_id: int, cantidad_auxiliar: int = None,
+                           tipo: str = None, fecha: str = None):
+    return await insertar_agrupado(database.filas_cargas(
+        area, [(fecha, empresa, tipo, [trabajador_id], cantidad)], responsable_id, cantidad_auxiliar))
+
+async def agregar_registros_lote(trabajador_ids, area: str, empresa: str, cantidad: float,
+                                 responsable_id: int, tipo: str = None, fecha: str = None):
+    return await agregar_cargas(area, [(fecha, empresa, tipo, trabajador_ids, cantidad)], responsable_id)
+
+async def agregar_cargas(area: str, cargas, responsable_id: int):
+    """Todas las cargas quedan en la misma transacción: se guardan todas o ninguna."""
+    return await insertar_agrupado(database.filas_cargas(area, cargas, responsable_id))
+
+async def insertar_registros(filas):
+    return await escribir(database.insertar_registros, filas)
+
+# --- trabajadores ---
+async def upsert_trabajadores_lote(filas):
+    return await escribir(database.upsert_trabajadores_lote, filas)
+
+async def listar_trabajadores():
+    return await leer(database.listar_trabajadores)
+
+# --- usuarios autorizados ---
+async def guardar_usuario_autorizado(user_id: int, aprobado_por: int = None):
+    return await escribir(database.guardar_usuario_autorizado, user_id, aprobado_por)
+
+async def eliminar_usuario_autorizado(user_id: int):
+    return await escribir(database.eliminar_usuario_autorizado, user_id)
+
+# --- persistencia de conversaciones ---
+async def leer_sesiones(tipo: str):
+    return await leer(database.leer_sesiones, tipo)
+
+async def leer_conversaciones(nombre: str):
+    return await leer(database.leer_conversaciones, nombre)
+
+async def guardar_persistencia(sesiones, conversaciones):
+    return await escribir(database.guardar_persistencia, sesiones, conversaciones)
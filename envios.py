@@ -0,0 +1,132 @@
+# envios.py
+# Límite de velocidad de todo lo que el bot envía a Telegram (respuestas, avisos a administradores,
+# notificaciones). Se instala en el Application, así cada llamada a la API pasa por aquí.
+#
+# Cubetas de tokens con los límites de Telegram: ~30 mensajes/s en total, 1 mensaje/s por chat
+# privado (con ráfagas cortas) y 20 mensajes/min por grupo. Las esperas se reservan en orden de
+# llegada, así que muchos envíos concurrentes (asyncio.gather) salen tan rápido como se permite.
+# Ante RetryAfter (429) se pausan todos los envíos el tiempo indicado y se reintenta.
+import asyncio
+import logging
+import time
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+import metricas
+from config import (
+    ENVIOS_MAX_POR_SEG, ENVIOS_POR_CHAT_SEG, ENVIOS_RAFAGA_CHAT, ENVIOS_GRUPO_POR_MIN, ENVIOS_MAX_REINTENTOS
+)
+
+logger = logging.getLogger(__name__)
+
+class _Cubeta:
+    """Cubeta de tokens: 'tasa' tokens por segundo, hasta 'capacidad' acumulados."""
+
+    def __init__(self, tasa: float, capacidad: float):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._tokens = capacidad
+        self._ultimo = None
+
+    def reservar(self, ahora: float) -> float:
+        """Toma un token y devuelve cuántos segundos hay que esperar para usarlo.
+
+        Los tokens pueden quedar en negativo: cada envío reserva su turno y los siguientes esperan más.
+        """
+        if self._ultimo is not None:
+            self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.tasa
+
+    def llena(self, ahora: float) -> bool:
+        return self._tokens + (ahora - self._ultimo) * self.tasa >= self.capacidad
+
+class LimitadorEnvios(BaseRateLimiter):
+    def __init__(self, max_por_seg: float = ENVIOS_MAX_POR_SEG, por_chat_seg: float = ENVIOS_POR_CHAT_SEG,
+                 rafaga_chat: int = ENVIOS_RAFAGA_CHAT, grupo_por_min: float = ENVIOS_GRUPO_POR_MIN,
+                 max_reintentos: int = ENVIOS_MAX_REINTENTOS):
+        # Sin ráfaga global: con capacidad max_por_seg, la ráfaga inicial más la recarga podrían
+        # sumar casi el doble en el primer segundo
+        self._global = _Cubeta(max_por_seg, 1)
+        self._por_chat_seg = por_chat_seg
+        self._rafaga_chat = rafaga_chat
+        self._grupo_por_min = grupo_por_min
+        self._max_reintentos = max_reintentos
+        self._chats = {}
+        self._pausa_hasta = 0.0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _cubeta_chat(self, chat_id, ahora: float):
+        if len(self._chats) > 1000:
+            # Los chats con la cubeta llena no tienen nada pendiente: se descartan
+            self._chats = {c: b for c, b in self._chats.items() if not b.llena(ahora)}
+        cubeta = self._chats.get(chat_id)
+        if cubeta is None:
+            # chat_id negativo (o @nombre): grupo o canal
+            if isinstance(chat_id, str) or chat_id < 0:
+                cubeta = _Cubeta(self._grupo_por_min / 60, self._grupo_por_min)
+            else:
+                cubeta = _Cubeta(self._por_chat_seg, self._rafaga_chat)
+            self._chats[chat_id] = cubeta
+        return cubeta
+
+    async def _turno(self, chat_id):
+        loop = asyncio.get_running_loop()
+        # Después de un RetryAfter nadie envía hasta que termine la pausa
+        while loop.time() < self._pausa_hasta:
+            await asyncio.sleep(self._pausa_hasta - loop.time())
+        if chat_id is not None:
+            espera = self._cubeta_chat(chat_id, loop.time()).reservar(loop.time())
+            if espera:
+                await asyncio.sleep(espera)
+        espera = self._global.reservar(loop.time())
+        if espera:
+            await asyncio.sleep(espera)
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        """rate_limit_args: máximo de reintentos por RetryAfter para esta llamada (opcional)."""
+        chat_id = data.get("chat_id")
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            pass
+        max_reintentos = self._max_reintentos if rate_limit_args is None else rate_limit_args
+        for intento in range(max_reintentos + 1):
+            inicio = time.perf_counter()
+            await self._turno(chat_id)
+            llamada = time.perf_counter()
+            metricas.observar("kamada_envios_espera_segundos", (), llamada - inicio)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if intento == max_reintentos:
+                    logger.error("Telegram sigue limitando %s tras %d reintentos", endpoint, max_reintentos)
+                    raise
+                espera = e.retry_after
+                espera = espera.total_seconds() if hasattr(espera, "total_seconds") else float(espera)
+                # Si vuelve a pasar, se espera cada vez un poco más que lo pedido
+                espera += 0.1 * 2 ** intento
+                logger.warning("Límite de Telegram en %s: se pausan los envíos %.1f s", endpoint, espera)
+                loop = asyncio.get_running_loop()
+                self._pausa_hasta = max(self._pausa_hasta, loop.time() + espera)
+            finally:
+                metricas.observar("kamada_telegram_api_segundos", (endpoint,), time.perf_counter() - llamada)
+
+async def enviar_a_varios(bot, chat_ids, texto: str, **kwargs):
+    """Envía el mismo mensaje a varios chats en paralelo (el limitador regula la velocidad).
+
+    Devuelve {chat_id: excepción} con los envíos que fallaron.
+    """
+    chat_ids = list(chat_ids)
+    resultados = await asyncio.gather(
+        *(bot.send_message(chat_id=chat_id, text=texto, **kwargs) for chat_id in chat_ids),
+        return_exceptions=True,
+    )
+    return {c: r for c, r in zip(chat_ids, resultados) if isinstance(r, Exception)}
@@ -1,7 +1,15 @@
 # handlers/base_handlers.py
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import asyncio
+import math
+import os
+from decimal import Decimal
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
 from telegram.ext import ContextTypes, ConversationHandler
+import cache_reportes
+import db_async
+import plantilla
 from config import validar_clave
+from reportes import exportar_detalle, generar_reporte, hay_cola
 from datetime import datetime
 
 # Estados comunes (Se usan en todos los módulos de producción)
@@ -56,4 +64,165 @@ async def recibir_empresa_base(update: Update, context: ContextTypes.DEFAULT_TYP
     if prompt_text:
         await q.edit_message_text(prompt_text)
     
-    return next_state
\ No newline at end of file
+    return next_state
+
+def parsear_cantidad(texto: str) -> float:
+    """Cantidad positiva con hasta 2 decimales (kg, cajas); acepta coma decimal. ValueError si no es válida.
+
+    La base guarda centésimas exactas (database.ESCALA_CANTIDAD): un tercer decimal se perdería.
+    """
+    texto = texto.strip().replace(",", ".")
+    cantidad = float(texto)
+    # float() acepta 'inf' y 'nan', que pasan la comparación con 0 y no se pueden guardar
+    if not math.isfinite(cantidad) or cantidad <= 0:
+        raise ValueError(texto)
+    if Decimal(texto).normalize().as_tuple().exponent < -2:
+        raise ValueError(texto)
+    return cantidad
+
+# Carga masiva (Línea y Empaque): una carga por línea, "fecha;empresa;tipo;ids;cajas"
+EMPRESAS = ("Kamada", "Pariamar")
+TIPOS = ("Tomate", "Aceite")
+FORMATO_CARGA_MASIVA = "fecha;empresa;tipo;ids;cajas (ej: 14/10/2025;Kamada;Tomate;12,34,56;2)"
+MAX_LINEAS_RESUMEN = 30  # el resumen debe entrar en un mensaje de Telegram
+MAX_IDS_RESUMEN = 50     # ídem para la lista de IDs no registrados
+
+def es_carga_masiva(texto: str) -> bool:
+    return ";" in texto
+
+def parsear_carga_masiva(texto: str, cajas_decimales: bool):
+    """Valida todas las líneas de una vez.
+
+    Devuelve (cargas, errores): cargas es [(fecha, empresa, tipo, ids, cajas)] con la fecha en
+    formato de la BD; errores es la lista de problemas por número de línea (vacía si todo es válido).
+    """
+    empresas = {e.lower(): e for e in EMPRESAS}
+    tipos = {t.lower(): t for t in TIPOS}
+    cargas, errores = [], []
+    for n, linea in enumerate(texto.splitlines(), start=1):
+        if not linea.strip():
+            continue
+        campos = [c.strip() for c in linea.split(";")]
+        if len(campos) != 5:
+            errores.append(f"Línea {n}: se esperaban 5 campos ({FORMATO_CARGA_MASIVA})")
+            continue
+        fecha, empresa, tipo, ids, cajas = campos
+        problemas = []
+        try:
+            fecha = datetime.strptime(fecha, "%d/%m/%Y").strftime("%Y-%m-%d")
+        except ValueError:
+            problemas.append("fecha inválida (DD/MM/AAAA)")
+        empresa = empresas.get(empresa.lower())
+        if empresa is None:
+            problemas.append(f"empresa debe ser {' o '.join(EMPRESAS)}")
+        tipo = tipos.get(tipo.lower())
+        if tipo is None:
+            problemas.append(f"tipo debe ser {' o '.join(TIPOS)}")
+        partes = [x.strip() for x in ids.split(",")]
+        if not partes or not all(x.isdigit() for x in partes):
+            problemas.append("IDs inválidos (números separados por coma)")
+        try:
+            cajas = parsear_cantidad(cajas) if cajas_decimales else int(cajas)
+            if cajas <= 0:
+                raise ValueError
+        except ValueError:
+            problemas.append("cajas inválidas" + (" (hasta 2 decimales)" if cajas_decimales else " (solo enteros positivos)"))
+        if problemas:
+            errores.append(f"Línea {n}: {', '.join(problemas)}")
+        else:
+            cargas.append((fecha, empresa, tipo, [int(x) for x in partes], cajas))
+    if not cargas and not errores:
+        errores.append(f"No se encontró ninguna carga. Formato: {FORMATO_CARGA_MASIVA}")
+    return cargas, errores
+
+def resumen_carga_masiva(titulo: str, cargas, responsable_id: int) -> str:
+    """Confirmación única de todas las cargas, con los IDs no registrados de todas ellas."""
+    lineas = [f"**Confirme la carga masiva de {titulo}:**"]
+    for i, (fecha, empresa, tipo, ids, cajas) in enumerate(cargas[:MAX_LINEAS_RESUMEN], start=1):
+        lineas.append(f"{i}) {fecha} {empresa} {tipo}: {len(ids)} trabajadores × {cajas} cajas")
+    if len(cargas) > MAX_LINEAS_RESUMEN:
+        lineas.append(f"… y {len(cargas) - MAX_LINEAS_RESUMEN} cargas más")
+    _, desconocidos = plantilla.separar_ids(tid for carga in cargas for tid in carga[3])
+    lineas.append(f"Total: {len(cargas)} cargas, {sum(len(c[3]) for c in cargas)} registros")
+    if desconocidos:
+        desconocidos = sorted(set(desconocidos))
+        texto = ", ".join(map(str, desconocidos[:MAX_IDS_RESUMEN]))
+        if len(desconocidos) > MAX_IDS_RESUMEN:
+            texto += f" … y {len(desconocidos) - MAX_IDS_RESUMEN} más"
+        lineas.append(f"⚠️ IDs no registrados: {texto}")
+    lineas.append(f"ID Responsable: {responsable_id}")
+    return "\n".join(lineas)
+
+def separar_exportacion(texto: str):
+    """Separa el sufijo opcional que pide exportar cada registro: 'detalle' (Excel) o 'csv' (CSV comprimido).
+
+    Devuelve (texto, formato) con formato None, "xlsx" o "csv".
+    """
+    texto = texto.strip()
+    for sufijo, formato in (("detalle", "xlsx"), ("csv", "csv")):
+        if texto.lower().endswith(sufijo):
+            return texto[:-len(sufijo)].strip(), formato
+    return texto, None
+
+async def _avisar_espera(message):
+    espera = "⏳ Hay otros reportes en curso, el suyo está en cola…" if hay_cola() else "⏳ Generando reporte…"
+    await message.reply_text(espera)
+
+async def _finalizar(message):
+    # NUEVO: Botón de volver al menú
+    kb = [[InlineKeyboardButton("🏠 Menú", callback_data="/menu")]]
+    await message.reply_text("✅ Operación finalizada.", reply_markup=InlineKeyboardMarkup(kb))
+    return ConversationHandler.END
+
+async def enviar_reporte(update: Update, tipo: str, inicio: str, fin: str, nombre_excel: str, sin_registros: str):
+    """Envía el reporte (desde la caché o generándolo en el pool de procesos) y termina la conversación."""
+    message = update.message
+    # Si los datos no cambiaron desde la última vez, se reenvía el reporte ya generado
+    archivos = await db_async.leer(cache_reportes.buscar, tipo, inicio, fin)
+    if archivos is None:
+        await _avisar_espera(message)
+        try:
+            archivos = await generar_reporte(tipo, inicio, fin)
+        except asyncio.TimeoutError:
+            await message.reply_text("⌛ El reporte tardó demasiado y fue cancelado. Intente con menos días o más tarde.")
+            return ConversationHandler.END
+        if archivos is None:
+            await message.reply_text(sin_registros)
+            return ConversationHandler.END
+    excel, imagenes = archivos
+
+    await message.reply_text("📊 Reporte generado.")
+    await message.reply_document(excel, filename=nombre_excel)
+    if not imagenes:
+        await message.reply_text("🖼️ El reporte tiene demasiadas filas para enviarlo como imagen; revise el Excel.")
+    else:
+        # Telegram admite de 2 a 10 fotos por álbum: una página suelta (sola o la última) va como foto
+        for i in range(0, len(imagenes), 10):
+            album = imagenes[i:i + 10]
+            if len(album) == 1:
+                await message.reply_photo(album[0])
+            else:
+                await message.reply_media_group([InputMediaPhoto(jpg) for jpg in album])
+    return await _finalizar(message)
+
+async def enviar_exportacion(update: Update, inicio: str, fin: str, nombre_base: str, sin_registros: str,
+                             formato: str):
+    """Exporta cada registro del rango (en streaming, memoria constante) y envía el archivo."""
+    message = update.message
+    await _avisar_espera(message)
+    try:
+        ruta = await exportar_detalle(inicio, fin, formato=formato)
+    except asyncio.TimeoutError:
+        await message.reply_text("⌛ La exportación tardó demasiado y fue cancelada. Intente con menos días o más tarde.")
+        return ConversationHandler.END
+    if ruta is None:
+        await message.reply_text(sin_registros)
+        return ConversationHandler.END
+
+    try:
+        with open(ruta, "rb") as archivo:
+            extension = ".csv.gz" if formato == "csv" else ".xlsx"
+            await message.reply_document(archivo, filename=nombre_base + extension)
+    finally:
+        os.remove(ruta)
+    return await _finalizar(message)
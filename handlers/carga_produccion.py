@@ -0,0 +1,230 @@
+# handlers/carga_produccion.py
+# Carga de registros de producción desde un Excel o CSV (días con el bot caído, planillas en papel).
+import asyncio
+import io
+import logging
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import (
+    ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters
+)
+import db_async
+import plantilla
+from config import validar_clave, es_admin
+from handlers.base_handlers import EMPRESAS, TIPOS
+
+logger = logging.getLogger(__name__)
+
+ESPERANDO_CLAVE, ESPERANDO_ARCHIVO = range(2)
+
+# pandas se importa al recibir el primer archivo, no al arrancar el bot.
+
+COLUMNAS = ['Fecha', 'Area', 'Empresa', 'Tipo', 'Cantidad', 'Trabajador ID']
+AREAS = ("Sardina", "Mesa", "Línea", "Empaque")
+AREAS_CON_TIPO = ("Línea", "Empaque")  # el tipo debe ser Tomate o Aceite; en Sardina es el proveedor
+
+# Filas por transacción: entre bloques el hilo escritor atiende las cargas de los supervisores
+BLOQUE_INSERCION = 5000
+
+class ColumnasFaltantes(ValueError):
+    """Al archivo le faltan columnas obligatorias (ver COLUMNAS)."""
+
+class CargaInterrumpida(Exception):
+    """Falló la inserción de un bloque. Los bloques anteriores ya quedaron guardados y el que falló no."""
+
+    def __init__(self, causa, insertados: int, fila_archivo: int, rechazadas, n_rechazadas: int):
+        super().__init__(str(causa))
+        self.insertados = insertados
+        self.fila_archivo = fila_archivo  # primera fila del archivo que no se guardó
+        self.rechazadas = rechazadas
+        self.n_rechazadas = n_rechazadas
+
+def _leer_archivo(file_bytes, nombre_archivo: str):
+    import pandas as pd
+
+    if nombre_archivo.lower().endswith('.csv'):
+        # sep=None detecta ',' o ';' (Excel en español exporta con ';')
+        df = pd.read_csv(file_bytes, dtype=str, sep=None, engine='python', encoding='utf-8-sig')
+    else:
+        df = pd.read_excel(file_bytes, dtype=object)
+    df.columns = [str(c).strip() for c in df.columns]
+    faltantes = [c for c in COLUMNAS if c not in df.columns]
+    if faltantes:
+        raise ColumnasFaltantes(", ".join(faltantes))
+    return df.dropna(how='all')
+
+def _normalizar(serie, valores):
+    """Lleva los textos a la forma canónica (sin importar mayúsculas ni tildes); NaN si no es válido."""
+    sin_tildes = str.maketrans("áéíóúÁÉÍÓÚ", "aeiouAEIOU")
+    canonicos = {v.translate(sin_tildes).lower(): v for v in valores}
+    return serie.astype('string').str.strip().str.translate(sin_tildes).str.lower().map(canonicos)
+
+def _parsear_fechas(serie):
+    """DD/MM/AAAA (lo que pide el mensaje) o AAAA-MM-DD; cualquier otro valor queda NaT.
+
+    Cada pasada usa un formato explícito: con dayfirst y format='mixed' pandas leía 2025-10-03 como
+    10 de marzo, sin rechazar la fila. Las celdas de fecha de Excel llegan como datetime y pasan tal cual.
+    """
+    import pandas as pd
+
+    textos = serie.map(lambda v: v.strip() if isinstance(v, str) else v)
+    fechas = pd.to_datetime(textos, format="%d/%m/%Y", errors='coerce')
+    iso = pd.to_datetime(textos.where(fechas.isna()), format="%Y-%m-%d", errors='coerce')
+    return fechas.fillna(iso)
+
+def validar_produccion(df, responsable_id: int):
+    """Validación vectorizada. Devuelve (filas para insertar, su índice en df, DataFrame de rechazadas con 'Motivo')."""
+    import numpy as np
+    import pandas as pd
+
+    fechas = _parsear_fechas(df['Fecha'])
+    areas = _normalizar(df['Area'], AREAS)
+    empresas = _normalizar(df['Empresa'], EMPRESAS)
+    tipos_canonicos = _normalizar(df['Tipo'], TIPOS)
+    tipos = df['Tipo'].astype('string').str.strip().replace("", pd.NA)
+    cantidades = pd.to_numeric(df['Cantidad'].astype('string').str.replace(',', '.', regex=False), errors='coerce')
+    ids = pd.to_numeric(df['Trabajador ID'], errors='coerce')
+
+    con_tipo = areas.isin(AREAS_CON_TIPO)
+    # to_numeric acepta 'inf' y 1e400 (infinito): no se pueden guardar como cantidad
+    cantidades_validas = ((cantidades > 0) & np.isfinite(cantidades)).fillna(False)
+    ids_validos = (ids > 0) & (ids % 1 == 0)
+    chequeos = [
+        (fechas.isna(), "fecha inválida (DD/MM/AAAA o AAAA-MM-DD)"),
+        (areas.isna(), f"área debe ser {', '.join(AREAS)}"),
+        (empresas.isna(), f"empresa debe ser {' o '.join(EMPRESAS)}"),
+        (con_tipo & tipos_canonicos.isna(), f"tipo debe ser {' o '.join(TIPOS)}"),
+        (~cantidades_validas, "cantidad inválida"),
+        # Se guardan centésimas exactas: un tercer decimal se perdería
+        (cantidades_validas & ((cantidades * 100 - (cantidades * 100).round()).abs() > 1e-6),
+         "cantidad con más de 2 decimales"),
+        (~ids_validos, "ID de trabajador inválido"),
+        (ids_validos & ~ids.isin(list(plantilla.ids_registrados())), "trabajador no registrado"),
+    ]
+    motivo = pd.Series("", index=df.index, dtype=object)
+    for mascara, texto in chequeos:
+        mascara = mascara.fillna(True).astype(bool)
+        motivo[mascara] = motivo[mascara] + texto + "; "
+    validos = motivo == ""
+
+    # En Línea/Empaque el tipo queda en su forma canónica; en Mesa no se usa; en Sardina es el proveedor
+    tipo_final = tipos.where(~con_tipo, tipos_canonicos).where(areas != "Mesa", None)
+    filas = list(zip(
+        fechas[validos].dt.strftime("%Y-%m-%d"),
+        areas[validos],
+        empresas[validos],
+        tipo_final[validos].astype(object).where(tipo_final[validos].notna(), None),
+        cantidades[validos].astype(float),
+        ids[validos].astype('int64'),
+        [responsable_id] * int(validos.sum()),
+        [None] * int(validos.sum()),  # cantidad_auxiliar: el archivo no trae cestas
+    ))
+    rechazadas = df[~validos].assign(Motivo=motivo[~validos].str.rstrip("; "))
+    return filas, df.index[validos], rechazadas
+
+def preparar_produccion(file_bytes, nombre_archivo: str, responsable_id: int):
+    """Lee y valida el archivo.
+
+    Devuelve (filas para insertar, su número de fila en el archivo, csv de rechazadas o None, cantidad de rechazadas).
+    """
+    df = _leer_archivo(file_bytes, nombre_archivo)
+    filas, indices, rechazadas = validar_produccion(df, responsable_id)
+    # Número de fila en el archivo: la 1 es el encabezado
+    filas_archivo = (indices + 2).tolist()
+    if rechazadas.empty:
+        return filas, filas_archivo, None, 0
+    rechazadas.insert(0, 'Fila', rechazadas.index + 2)
+    archivo = io.BytesIO()
+    rechazadas.to_csv(archivo, index=False, encoding='utf-8-sig')
+    return filas, filas_archivo, archivo.getvalue(), len(rechazadas)
+
+async def importar_produccion(file_bytes, nombre_archivo: str, responsable_id: int):
+    """Carga masiva de producción. Devuelve (insertados, csv de rechazadas o None, cantidad de rechazadas).
+
+    Si falla un bloque lanza CargaInterrumpida con lo ya insertado y la fila del archivo donde se detuvo.
+    """
+    # Lectura y validación en un hilo aparte; los bloques se encolan en el escritor uno a uno
+    filas, filas_archivo, rechazadas, n_rechazadas = await asyncio.to_thread(
+        preparar_produccion, file_bytes, nombre_archivo, responsable_id)
+    insertados = 0
+    for i in range(0, len(filas), BLOQUE_INSERCION):
+        try:
+            insertados += await db_async.insertar_registros(filas[i:i + BLOQUE_INSERCION])
+        except Exception as e:
+            raise CargaInterrumpida(e, insertados, filas_archivo[i], rechazadas, n_rechazadas) from e
+    return insertados, rechazadas, n_rechazadas
+
+async def menu_carga_produccion(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    if not es_admin(user_id):
+        await update.message.reply_text("⛔ Acceso denegado. Solo los administradores pueden cargar producción desde archivo.")
+        return ConversationHandler.END
+
+    await update.message.reply_text("🔑 Ingrese la clave de acceso para carga de producción:")
+    return ESPERANDO_CLAVE
+
+async def recibir_clave(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not validar_clave("produccion", update.message.text.strip()):
+        await update.message.reply_text("❌ Clave incorrecta. Intente de nuevo:")
+        return ESPERANDO_CLAVE
+
+    msg = ("📄 Adjunte el archivo **Excel (.xlsx)** o **CSV** con los registros de producción.\n"
+           f"**Columnas obligatorias:** {', '.join(COLUMNAS)}\n"
+           "- Fecha: DD/MM/AAAA (también AAAA-MM-DD)\n"
+           f"- Area: {', '.join(AREAS)}\n"
+           f"- Tipo: {' o '.join(TIPOS)} en Línea y Empaque; proveedor en Sardina; vacío en Mesa\n"
+           "Las filas con errores se devuelven en un archivo con el motivo.")
+    await update.message.reply_text(msg)
+    return ESPERANDO_ARCHIVO
+
+async def recibir_archivo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    documento = update.message.document
+    if not documento or not documento.file_name.lower().endswith(('.xlsx', '.xls', '.csv')):
+        await update.message.reply_text("❌ Por favor, envíe un archivo **.xlsx**, **.xls** o **.csv**.")
+        return ESPERANDO_ARCHIVO
+
+    file_info = await context.bot.get_file(documento.file_id)
+    file_bytes = io.BytesIO()
+    await file_info.download_to_memory(file_bytes)
+    file_bytes.seek(0)
+
+    try:
+        insertados, rechazadas, n_rechazadas = await importar_produccion(
+            file_bytes, documento.file_name, update.effective_user.id)
+    except ColumnasFaltantes as e:
+        await update.message.reply_text(f"❌ Faltan columnas en el archivo: **{e}**.")
+        return ESPERANDO_ARCHIVO
+    except CargaInterrumpida as e:
+        logger.exception("Carga de producción interrumpida en la fila %d", e.fila_archivo)
+        if e.rechazadas is not None:
+            await update.message.reply_document(e.rechazadas, filename="produccion_rechazadas.csv")
+        await update.message.reply_text(
+            f"⚠️ La carga se detuvo en la fila **{e.fila_archivo}** del archivo: {e}\n"
+            f"➕ Registros insertados: **{e.insertados}** (las filas válidas anteriores a la {e.fila_archivo})\n"
+            f"⚠️ Filas rechazadas: **{e.n_rechazadas}**\n"
+            f"Para no duplicar registros, vuelva a subir sólo las filas desde la {e.fila_archivo} en adelante.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🏠 Menú Principal", callback_data="/menu")]]))
+        return ConversationHandler.END
+    except Exception as e:
+        await update.message.reply_text(f"❌ Ocurrió un error al procesar el archivo: {e}\nPor favor, revise el formato.")
+        return ESPERANDO_ARCHIVO
+
+    msg = (f"✅ Carga de producción realizada.\n"
+           f"➕ Registros insertados: **{insertados}**\n"
+           f"⚠️ Filas rechazadas: **{n_rechazadas}**")
+    if rechazadas is not None:
+        await update.message.reply_document(rechazadas, filename="produccion_rechazadas.csv")
+    await update.message.reply_text(msg,
+                                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🏠 Menú Principal", callback_data="/menu")]]))
+    return ConversationHandler.END
+
+def build_carga_produccion_handler():
+    return ConversationHandler(
+        entry_points=[CommandHandler("cargar_produccion", menu_carga_produccion)],
+        states={
+            ESPERANDO_CLAVE: [MessageHandler(filters.TEXT & ~filters.COMMAND, recibir_clave)],
+            ESPERANDO_ARCHIVO: [MessageHandler(filters.ATTACHMENT, recibir_archivo)]
+        },
+        fallbacks=[CommandHandler("cancel", menu_carga_produccion)],
+        name="carga_produccion",
+        persistent=True,
+    )
@@ -4,7 +4,11 @@ from telegram.ext import (
     ContextTypes, ConversationHandler, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 )
 from config import validar_clave
-from database import agregar_registro
+import db_async
+from handlers.base_handlers import (
+    FORMATO_CARGA_MASIVA, es_carga_masiva, parsear_carga_masiva, resumen_carga_masiva
+)
+from plantilla import describir_ids
 from datetime import datetime
 
 ESPERANDO_CLAVE, ESPERANDO_FECHA, ESPERANDO_EMPRESA, ESPERANDO_TIPO, ESPERANDO_IDS, ESPERANDO_CAJA, CONFIRMAR = range(7)
@@ -22,10 +26,14 @@ async def recibir_clave(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ESPERANDO_CLAVE
     
     context.user_data['responsable_registro'] = update.effective_user.id
-    await update.message.reply_text("📅 Ingrese la fecha (DD/MM/AAAA):")
+    await update.message.reply_text("📅 Ingrese la fecha (DD/MM/AAAA).\n"
+                                    f"📋 O pegue varias cargas, una por línea: {FORMATO_CARGA_MASIVA}")
     return ESPERANDO_FECHA
 
 async def recibir_fecha(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data.pop('cargas', None)
+    if es_carga_masiva(update.message.text):
+        return await recibir_carga_masiva(update, context)
     try:
         fecha = datetime.strptime(update.message.text.strip(), "%d/%m/%Y").strftime("%Y-%m-%d")
         context.user_data['fecha'] = fecha
@@ -40,6 +48,22 @@ async def recibir_fecha(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("🏭 Seleccione la empresa que fabrica:", reply_markup=InlineKeyboardMarkup(kb))
     return ESPERANDO_EMPRESA
 
+async def recibir_carga_masiva(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    cargas, errores = parsear_carga_masiva(update.message.text, cajas_decimales=False)
+    if errores:
+        await update.message.reply_text("❌ Revise la carga (no se guardó nada):\n" + "\n".join(errores[:20]))
+        return ESPERANDO_FECHA
+
+    context.user_data['cargas'] = cargas
+    kb = [
+        [InlineKeyboardButton("✅ Confirmar", callback_data="confirmar_si")],
+        [InlineKeyboardButton("✏️ Editar", callback_data="editar_carga_empaque")],
+        [InlineKeyboardButton("❌ Cancelar", callback_data="confirmar_no")]
+    ]
+    resumen = resumen_carga_masiva("Empaque", cargas, context.user_data['responsable_registro'])
+    await update.message.reply_text(resumen, reply_markup=InlineKeyboardMarkup(kb))
+    return CONFIRMAR
+
 async def recibir_empresa(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -91,7 +115,7 @@ async def recibir_caja(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"Fecha: {d['fecha']}\n"
         f"Empresa: {d['empresa']}\n"
         f"Tipo: {d['tipo']}\n"
-        f"Trabajadores ID: {', '.join(map(str, d['ids']))}\n"
+        f"Trabajadores: {describir_ids(d['ids'])}\n"
         f"Cajas producidas: {d['cantidad']}\n"
         f"ID Responsable: {d['responsable_registro']}\n"
     )
@@ -112,18 +136,22 @@ async def confirmar(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ESPERANDO_FECHA
         
     d = context.user_data
-    if q.data=="confirmar_si":
-        for tid in d["ids"]:
-            agregar_registro(
-                trabajador_id=tid, 
-                area="Empaque", 
-                empresa=d["empresa"], 
-                cantidad=d["cantidad"], 
-                responsable_id=d["responsable_registro"], 
-                cantidad_auxiliar=None, 
-                tipo=d["tipo"], 
-                fecha=d["fecha"]
-            )
+    cargas = d.pop("cargas", None)
+    if q.data=="confirmar_si" and cargas:
+        # Todas las cargas del mensaje en una sola transacción: se guardan todas o ninguna
+        registros = await db_async.agregar_cargas("Empaque", cargas, d["responsable_registro"])
+        await q.edit_message_text(f"✅ {len(cargas)} cargas guardadas ({registros} registros).", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🏠 Menú", callback_data="/menu")]]))
+    elif q.data=="confirmar_si":
+        # Un solo INSERT por lote: todos los trabajadores se guardan o ninguno
+        await db_async.agregar_registros_lote(
+            trabajador_ids=d["ids"], 
+            area="Empaque", 
+            empresa=d["empresa"], 
+            cantidad=d["cantidad"], 
+            responsable_id=d["responsable_registro"], 
+            tipo=d["tipo"], 
+            fecha=d["fecha"]
+        )
         await q.edit_message_text("✅ Registro guardado.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🏠 Menú", callback_data="/menu")]]))
     else:
         await q.edit_message_text("❌ Cancelado.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🏠 Menú", callback_data="/menu")]]))
@@ -142,5 +170,7 @@ def build_empaque_handler():
             ESPERANDO_CAJA: [MessageHandler(filters.TEXT & ~filters.COMMAND, recibir_caja)],
             CONFIRMAR: [CallbackQueryHandler(confirmar)],
         },
-        fallbacks=[CommandHandler("cancel", confirmar)]
+        fallbacks=[CommandHandler("cancel", confirmar)],
+        name="empaque",
+        persistent=True,
     )
\ No newline at end of file
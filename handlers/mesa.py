@@ -4,7 +4,8 @@ from telegram.ext import (
     ContextTypes, ConversationHandler, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 )
 from config import validar_clave
-from database import agregar_registro
+import db_async
+from plantilla import describir_ids
 from datetime import datetime
 
 ESPERANDO_CLAVE, ESPERANDO_FECHA, ESPERANDO_EMPRESA, ESPERANDO_IDS, ESPERANDO_CESTAS, CONFIRMAR = range(6)
@@ -77,7 +78,7 @@ async def recibir_cestas(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"**Confirme el Registro de Mesa de Llenado:**\n"
         f"Fecha: {d['fecha']}\n"
         f"Empresa: {d['empresa']}\n"
-        f"Trabajadores ID: {', '.join(map(str, d['ids']))}\n"
+        f"Trabajadores: {describir_ids(d['ids'])}\n"
         f"Cestas procesadas: {d['cantidad']}\n"
         f"ID Responsable: {d['responsable_registro']}\n" 
     )
@@ -99,17 +100,16 @@ async def confirmar(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
     d = context.user_data
     if q.data=="confirmar_si":
-        for tid in d["ids"]:
-            agregar_registro(
-                trabajador_id=tid, 
-                area="Mesa", 
-                empresa=d["empresa"], 
-                cantidad=d["cantidad"], 
-                responsable_id=d["responsable_registro"], 
-                cantidad_auxiliar=None, 
-                tipo=None, 
-                fecha=d["fecha"]
-            )
+        # Un solo INSERT por lote: todos los trabajadores se guardan o ninguno
+        await db_async.agregar_registros_lote(
+            trabajador_ids=d["ids"], 
+            area="Mesa", 
+            empresa=d["empresa"], 
+            cantidad=d["cantidad"], 
+            responsable_id=d["responsable_registro"], 
+            tipo=None, 
+            fecha=d["fecha"]
+        )
         await q.edit_message_text("✅ Registro guardado.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🏠 Menú", callback_data="/menu")]]))
     else:
         await q.edit_message_text("❌ Cancelado.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🏠 Menú", callback_data="/menu")]]))
@@ -127,5 +127,7 @@ def build_mesa_handler():
             ESPERANDO_CESTAS: [MessageHandler(filters.TEXT & ~filters.COMMAND, recibir_cestas)],
             CONFIRMAR: [CallbackQueryHandler(confirmar)],
         },
-        fallbacks=[CommandHandler("cancel", confirmar)]
+        fallbacks=[CommandHandler("cancel", confirmar)],
+        name="mesa",
+        persistent=True,
     )
\ No newline at end of file
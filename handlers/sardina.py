@@ -5,7 +5,9 @@ from telegram.ext import (
     MessageHandler, CallbackQueryHandler, filters
 )
 from config import validar_clave
-from database import agregar_registro
+import db_async
+from handlers.base_handlers import parsear_cantidad
+from plantilla import describir_ids
 from datetime import datetime
 
 # Definición de estados
@@ -72,19 +74,15 @@ async def recibir_cestas(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Cantidad inválida. Ingrese el número de cestas (solo números enteros positivos):")
         return ESPERANDO_CESTAS
         
-    await update.message.reply_text("⚖️ Ingrese la cantidad de **Kg** recibidos (solo números positivos, puede usar decimales):")
+    await update.message.reply_text("⚖️ Ingrese la cantidad de **Kg** recibidos (solo números positivos, hasta 2 decimales):")
     return ESPERANDO_KG
 
 async def recibir_kg(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
-        # CAMBIO: Usar float() para permitir decimales
-        kg = float(update.message.text.strip())
-        if kg <= 0:
-            raise ValueError
-        context.user_data['kg'] = kg
+        context.user_data['kg'] = parsear_cantidad(update.message.text)
     except ValueError:
         # Mensaje de error actualizado
-        await update.message.reply_text("❌ Cantidad inválida. Ingrese la cantidad de Kg (solo números positivos, puede usar decimales):")
+        await update.message.reply_text("❌ Cantidad inválida. Ingrese la cantidad de Kg (solo números positivos, hasta 2 decimales):")
         return ESPERANDO_KG
         
     await update.message.reply_text("👤 Ingrese el **ID del Trabajador** que recibió la sardina (solo números enteros):")
@@ -108,7 +106,7 @@ async def recibir_id_trabajador(update: Update, context: ContextTypes.DEFAULT_TY
         f"Proveedor: {d['proveedor']}\n" 
         f"Cestas: {d['cestas']}\n"
         f"Kg: {d['kg']}\n"
-        f"ID Trabajador (Receptor): {d['trabajador_id']}\n" 
+        f"Trabajador (Receptor): {describir_ids([d['trabajador_id']])}\n" 
         f"ID Responsable (Supervisor): {d['responsable_registro']}\n" 
     )
     kb = [
@@ -130,11 +128,11 @@ async def confirmar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if q.data == "confirmar_si":
         d = context.user_data
         
-        agregar_registro(
+        await db_async.agregar_registro(
             trabajador_id=d["trabajador_id"],
             area="Sardina", 
             empresa=d["empresa"], 
-            cantidad=d["kg"], # Se pasa como float a la función (aunque la DB use INTEGER)
+            cantidad=d["kg"], # Kg con decimales: se guarda en centésimas
             responsable_id=d["responsable_registro"],
             tipo=d["proveedor"], 
             cantidad_auxiliar=d["cestas"],
@@ -159,5 +157,7 @@ def build_sardina_handler():
             ESPERANDO_ID_TRABAJADOR: [MessageHandler(filters.TEXT & ~filters.COMMAND, recibir_id_trabajador)], 
             CONFIRMAR: [CallbackQueryHandler(confirmar)],
         },
-        fallbacks=[CommandHandler("cancel", confirmar)]
+        fallbacks=[CommandHandler("cancel", confirmar)],
+        name="sardina",
+        persistent=True,
     )
\ No newline at end of file
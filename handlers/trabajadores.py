@@ -1,15 +1,90 @@
 # handlers/trabajadores.py
-import pandas as pd
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters
 )
-from database import upsert_trabajador
+import db_async
+import plantilla
 from config import validar_clave, es_admin
+import asyncio
 import io
 
 ESPERANDO_CLAVE, ESPERANDO_EXCEL = range(2)
 
+# pandas y openpyxl se importan al recibir el primer Excel, no al arrancar el bot.
+
+# Filas leídas del Excel por bloque (limita la memoria en archivos grandes)
+BLOQUE_FILAS = 1000
+
+class ColumnasFaltantes(ValueError):
+    """El Excel no tiene las columnas 'ID' y 'Nombre'."""
+
+def _bloques_excel(file_bytes, es_xls: bool):
+    """Valida el encabezado y devuelve un generador de DataFrames ['ID', 'Nombre'] por bloques."""
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    if es_xls:
+        # openpyxl no lee .xls; en ese caso se usa pandas (archivos antiguos y pequeños)
+        df = pd.read_excel(file_bytes)
+        if 'ID' not in df.columns or 'Nombre' not in df.columns:
+            raise ColumnasFaltantes()
+        df = df[['ID', 'Nombre']]
+        return (df.iloc[i:i + BLOQUE_FILAS] for i in range(0, len(df), BLOQUE_FILAS))
+
+    wb = load_workbook(file_bytes, read_only=True, data_only=True)
+    filas = wb.active.iter_rows(values_only=True)
+    encabezado = [str(c).strip() if c is not None else "" for c in (next(filas, None) or ())]
+    if 'ID' not in encabezado or 'Nombre' not in encabezado:
+        wb.close()
+        raise ColumnasFaltantes()
+    i_id, i_nombre = encabezado.index('ID'), encabezado.index('Nombre')
+
+    def generar():
+        try:
+            bloque = []
+            for fila in filas:
+                bloque.append((fila[i_id] if i_id < len(fila) else None,
+                               fila[i_nombre] if i_nombre < len(fila) else None))
+                if len(bloque) >= BLOQUE_FILAS:
+                    yield pd.DataFrame(bloque, columns=['ID', 'Nombre'])
+                    bloque = []
+            if bloque:
+                yield pd.DataFrame(bloque, columns=['ID', 'Nombre'])
+        finally:
+            wb.close()
+    return generar()
+
+def _limpiar_bloque(df):
+    """Limpieza vectorizada de un bloque. Devuelve (DataFrame válido, cantidad de rechazados)."""
+    import pandas as pd
+
+    df = df.dropna(how='all')  # filas vacías al final de la hoja no cuentan como rechazadas
+    ids = pd.to_numeric(df['ID'], errors='coerce')
+    nombres = df['Nombre'].astype('string').str.strip()
+    validos = (ids > 0) & (ids % 1 == 0) & nombres.notna() & (nombres != "")
+    validos = validos.fillna(False).astype(bool)
+    limpio = pd.DataFrame({'ID': ids[validos].astype('int64'), 'Nombre': nombres[validos].astype(object)})
+    return limpio, int((~validos).sum())
+
+def leer_trabajadores(file_bytes, es_xls: bool = False):
+    """Lee y limpia el Excel de trabajadores. Devuelve (lista de (id, nombre), rechazados)."""
+    filas, rechazados = [], 0
+    for bloque in _bloques_excel(file_bytes, es_xls):
+        limpio, rech = _limpiar_bloque(bloque)
+        rechazados += rech
+        filas.extend(zip(limpio['ID'].tolist(), limpio['Nombre'].tolist()))
+    return filas, rechazados
+
+async def importar_trabajadores(file_bytes, es_xls: bool = False):
+    """Carga masiva del Excel de trabajadores. Devuelve (insertados, actualizados, rechazados).
+
+    La lectura con pandas/openpyxl corre en un hilo aparte; el hilo escritor solo recibe las filas limpias.
+    """
+    filas, rechazados = await asyncio.to_thread(leer_trabajadores, file_bytes, es_xls)
+    insertados, actualizados = await db_async.upsert_trabajadores_lote(filas)
+    return insertados, actualizados, rechazados
+
 async def menu_trabajadores(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     if not es_admin(user_id):
@@ -44,38 +119,29 @@ async def recibir_excel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     file_bytes.seek(0)
     
     try:
-        df = pd.read_excel(file_bytes)
-        
-        # Validación de columnas
-        if 'ID' not in df.columns or 'Nombre' not in df.columns:
-            await update.message.reply_text("❌ El archivo Excel debe contener las columnas **'ID'** y **'Nombre'**.")
-            return ESPERANDO_EXCEL
-            
-        # Limpieza de datos
-        df = df[['ID', 'Nombre']].dropna()
-        df['ID'] = pd.to_numeric(df['ID'], errors='coerce').fillna(-1).astype(int)
-        df = df[df['ID'] > 0]
-        
-        if df.empty:
-             await update.message.reply_text("❌ No se encontraron filas con IDs válidos y nombres. Verifique los datos.")
-             return ESPERANDO_EXCEL
-
-        # UPSERT en la base de datos
-        count = 0
-        for index, row in df.iterrows():
-            upsert_trabajador(row['ID'], row['Nombre'])
-            count += 1
-            
-        msg = f"✅ ¡Carga de trabajadores realizada con éxito! Se **insertaron/actualizaron {count}** registros.\n"
-        await update.message.reply_text(msg, 
-                                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🏠 Menú Principal", callback_data="/menu")]]))
-        
-        return ConversationHandler.END
-    
+        es_xls = update.message.document.file_name.endswith('.xls')
+        insertados, actualizados, rechazados = await importar_trabajadores(file_bytes, es_xls)
+        await plantilla.recargar()  # los resúmenes de producción verán los nombres nuevos
+    except ColumnasFaltantes:
+        await update.message.reply_text("❌ El archivo Excel debe contener las columnas **'ID'** y **'Nombre'**.")
+        return ESPERANDO_EXCEL
     except Exception as e:
         await update.message.reply_text(f"❌ Ocurrió un error al procesar el archivo: {e}\nPor favor, revise el formato.")
         return ESPERANDO_EXCEL
 
+    if insertados + actualizados == 0:
+        await update.message.reply_text(f"❌ No se encontraron filas con IDs válidos y nombres ({rechazados} rechazadas). Verifique los datos.")
+        return ESPERANDO_EXCEL
+
+    msg = (f"✅ ¡Carga de trabajadores realizada con éxito!\n"
+           f"➕ Insertados: **{insertados}**\n"
+           f"🔁 Actualizados: **{actualizados}**\n"
+           f"⚠️ Rechazados: **{rechazados}**\n")
+    await update.message.reply_text(msg, 
+                                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🏠 Menú Principal", callback_data="/menu")]]))
+    
+    return ConversationHandler.END
+
 def build_trabajadores_handler():
     return ConversationHandler(
         entry_points=[CommandHandler("trabajadores", menu_trabajadores)],
@@ -83,5 +149,7 @@ def build_trabajadores_handler():
             ESPERANDO_CLAVE: [MessageHandler(filters.TEXT & ~filters.COMMAND, recibir_clave)],
             ESPERANDO_EXCEL: [MessageHandler(filters.ATTACHMENT, recibir_excel)]
         },
-        fallbacks=[CommandHandler("cancel", menu_trabajadores)]
+        fallbacks=[CommandHandler("cancel", menu_trabajadores)],
+        name="trabajadores",
+        persistent=True,
     )
\ No newline at end of file
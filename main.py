@@ -1,12 +1,26 @@
 # main.py
+import asyncio
 import os
+# Backend sin interfaz gráfica para matplotlib, elegido antes de que se cargue: los procesos de
+# reportes lo heredan y matplotlib no prueba backends GUI al importarse.
+os.environ.setdefault("MPLBACKEND", "Agg")
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     ApplicationBuilder, CommandHandler, CallbackQueryHandler, ContextTypes
 )
-from database import init_db
-from config import autorizado, es_admin, ADMINISTRADORES, agregar_usuario_autorizado, remover_usuario_autorizado # Importar nuevas funciones
+import db_async
+from database import init_db, cerrar_conexiones
+from reportes import cerrar_pool_reportes
+from config import (autorizado, es_admin, ADMINISTRADORES, agregar_usuario_autorizado, remover_usuario_autorizado,
+                    cargar_usuarios_autorizados, PERSISTENCIA_INTERVALO_SEG, BOT_MODO, WEBHOOK_URL, WEBHOOK_LISTEN,
+                    WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET, METRICAS_ACTIVAS, METRICAS_ARCHIVO,
+                    METRICAS_INTERVALO_SEG)
+from persistencia import PersistenciaSQLite
+from envios import LimitadorEnvios, enviar_a_varios
+import metricas
+import plantilla
 import logging
+import secrets
 
 # Configuración básica de logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
@@ -18,6 +32,7 @@ from handlers.mesa import build_mesa_handler
 from handlers.linea import build_linea_handler
 from handlers.empaque import build_empaque_handler
 from handlers.trabajadores import build_trabajadores_handler
+from handlers.carga_produccion import build_carga_produccion_handler
 from handlers.resumen_por_fecha import build_resumen_handler
 from handlers.reporte_periodo import build_reporte_periodo_handler
 
@@ -31,25 +46,28 @@ def _menu_keyboard():
         [InlineKeyboardButton("📦 Empaque", callback_data="/empaque")],
         [InlineKeyboardButton("📊 Resumen por fecha", callback_data="/resumen")],
         [InlineKeyboardButton("📈 Reporte por periodo", callback_data="/reporte_periodo")],
-        [InlineKeyboardButton("👥 Trabajadores", callback_data="/trabajadores")]
+        [InlineKeyboardButton("👥 Trabajadores", callback_data="/trabajadores")],
+        [InlineKeyboardButton("📥 Cargar producción", callback_data="/cargar_produccion")]
     ])
 
 # NUEVA FUNCIÓN: Envía la solicitud al administrador
 async def enviar_solicitud_acceso(application, solicitante_id, username):
-    for admin_id in ADMINISTRADORES:
-        try:
-            kb = InlineKeyboardMarkup([
-                [InlineKeyboardButton("✅ Autorizar", callback_data=f"auth_approve_{solicitante_id}")],
-                [InlineKeyboardButton("❌ Rechazar", callback_data=f"auth_reject_{solicitante_id}")]
-            ])
-            mensaje = f"🔔 **SOLICITUD DE ACCESO**\nUsuario: @{username} (ID: `{solicitante_id}`)\n¿Desea autorizarlo?"
-            await application.bot.send_message(
-                chat_id=admin_id,
-                text=mensaje,
-                reply_markup=kb
-            )
-        except Exception as e:
-            logger.error(f"No se pudo enviar la solicitud al admin {admin_id}: {e}")
+    kb = InlineKeyboardMarkup([
+        [InlineKeyboardButton("✅ Autorizar", callback_data=f"auth_approve_{solicitante_id}")],
+        [InlineKeyboardButton("❌ Rechazar", callback_data=f"auth_reject_{solicitante_id}")]
+    ])
+    mensaje = f"🔔 **SOLICITUD DE ACCESO**\nUsuario: @{username} (ID: `{solicitante_id}`)\n¿Desea autorizarlo?"
+    # A todos los administradores a la vez; el limitador de envíos regula la velocidad
+    fallidos = await enviar_a_varios(application.bot, ADMINISTRADORES, mensaje, reply_markup=kb)
+    for admin_id, e in fallidos.items():
+        logger.error(f"No se pudo enviar la solicitud al admin {admin_id}: {e}")
+
+async def _notificar(bot, chat_id, texto, **kwargs):
+    try:
+        await bot.send_message(chat_id=chat_id, text=texto, **kwargs)
+    except Exception:
+        # Esto puede fallar si el usuario bloqueó el bot
+        pass
 
 # Manejadores de /start y /menu
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -108,45 +126,58 @@ async def handle_autorizacion(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     if action == "auth" and query.data.startswith("auth_approve"):
         # Autorizar y notificar al usuario y al administrador
-        agregar_usuario_autorizado(target_id)
+        await agregar_usuario_autorizado(target_id, aprobado_por=admin_id)
         
-        # Mensaje al administrador (edita el mensaje de solicitud)
-        await query.edit_message_text(f"✅ Acceso APROBADO para @{target_username}.")
-        
-        # Notificar al usuario (opcional)
-        try:
-            await context.application.bot.send_message(
-                chat_id=target_id, 
-                text="🎉 ¡Felicidades! El administrador ha APROBADO tu acceso. Usa /start para entrar al menú.",
-                reply_markup=_menu_keyboard()
-            )
-        except Exception:
-            # Esto puede fallar si el usuario bloqueó el bot
-            pass 
+        # Mensaje al administrador (edita el mensaje de solicitud) y aviso al usuario, en paralelo
+        await asyncio.gather(
+            query.edit_message_text(f"✅ Acceso APROBADO para @{target_username}."),
+            _notificar(context.application.bot, target_id,
+                       "🎉 ¡Felicidades! El administrador ha APROBADO tu acceso. Usa /start para entrar al menú.",
+                       reply_markup=_menu_keyboard()),
+        )
             
     elif action == "auth" and query.data.startswith("auth_reject"):
         # Rechazar y notificar al administrador
-        remover_usuario_autorizado(target_id)
-        
-        # Mensaje al administrador (edita el mensaje de solicitud)
-        await query.edit_message_text(f"❌ Acceso RECHAZADO para @{target_username}.")
+        await remover_usuario_autorizado(target_id)
         
-        # Notificar al usuario (opcional)
-        try:
-             await context.application.bot.send_message(
-                chat_id=target_id, 
-                text="❌ Lamentablemente, tu solicitud de acceso ha sido RECHAZADA por el administrador."
-            )
-        except Exception:
-            pass
-
-def main():
-    init_db()
-    app = ApplicationBuilder().token(TOKEN).build()
+        await asyncio.gather(
+            query.edit_message_text(f"❌ Acceso RECHAZADO para @{target_username}."),
+            _notificar(context.application.bot, target_id,
+                       "❌ Lamentablemente, tu solicitud de acceso ha sido RECHAZADA por el administrador."),
+        )
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not es_admin(update.effective_user.id):
+        await update.message.reply_text("⛔ Acceso denegado. Solo los administradores pueden ver las métricas.")
+        return
+    await update.message.reply_text(metricas.resumen())
+
+async def _al_iniciar(app):
+    if METRICAS_ACTIVAS and METRICAS_ARCHIVO:
+        metricas.iniciar_exportacion(METRICAS_ARCHIVO, METRICAS_INTERVALO_SEG)
+
+async def _al_detener(app):
+    # Las confirmaciones de producción que quedaron en cola se escriben antes de cerrar
+    await db_async.vaciar()
+    if METRICAS_ACTIVAS and METRICAS_ARCHIVO:
+        await metricas.detener_exportacion(METRICAS_ARCHIVO)
+
+def construir_app(builder=None):
+    """Arma el Application con todos los handlers.
+
+    builder: ApplicationBuilder con el token (y opcionalmente otro request, como el bot falso de
+    benchmarks/carga_conversaciones.py); por defecto uno con BOT_TOKEN.
+    """
+    if builder is None:
+        builder = ApplicationBuilder().token(TOKEN)
+    persistencia = PersistenciaSQLite(update_interval=PERSISTENCIA_INTERVALO_SEG)
+    app = (builder.persistence(persistencia).rate_limiter(LimitadorEnvios())
+           .post_init(_al_iniciar).post_stop(_al_detener).build())
 
     # Comandos base con chequeo de autorización
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("menu", menu))
+    app.add_handler(CommandHandler("stats", stats))
 
     # Manejador de la autorización (debe ir antes que el menu_callback)
     app.add_handler(CallbackQueryHandler(handle_autorizacion, pattern="^auth_"))
@@ -160,10 +191,37 @@ def main():
     app.add_handler(build_linea_handler())
     app.add_handler(build_empaque_handler())
     app.add_handler(build_trabajadores_handler())
+    app.add_handler(build_carga_produccion_handler())
     app.add_handler(build_resumen_handler())
     app.add_handler(build_reporte_periodo_handler())
 
-    app.run_polling()
+    metricas.ACTIVAS = METRICAS_ACTIVAS
+    if METRICAS_ACTIVAS:
+        metricas.instrumentar(app)
+    return app
+
+def main():
+    init_db()
+    cargar_usuarios_autorizados()
+    plantilla.cargar()
+    app = construir_app()
+
+    if BOT_MODO == "webhook":
+        if not WEBHOOK_URL:
+            raise SystemExit("BOT_MODO=webhook requiere WEBHOOK_URL (URL pública HTTPS que recibe los updates)")
+        # Telegram envía el secreto en cada POST; PTB rechaza con 403 los que no lo traen
+        app.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET or secrets.token_urlsafe(32),
+        )
+    else:
+        app.run_polling()
+    cerrar_pool_reportes()
+    db_async.cerrar()
+    cerrar_conexiones()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,197 @@
+# metricas.py
+# Histogramas de latencia de los puntos calientes del bot: cada handler (por conversación y estado),
+# las funciones de database.py que corren en db_async (ejecución y espera en la cola), la generación
+# de reportes y las llamadas a la API de Telegram. Los administradores los ven con /stats y, si
+# METRICAS_ARCHIVO está configurado, se escriben periódicamente en formato Prometheus para el
+# textfile collector de node_exporter.
+#
+# Todo se registra desde el event loop (db_async mide en el hilo y registra al volver), así que no
+# hacen falta locks. Registrar una medición es un bisect y unas sumas: menos de 1 µs.
+import asyncio
+import bisect
+import functools
+import logging
+import math
+import os
+import sys
+import time
+
+from telegram.ext import ConversationHandler
+
+logger = logging.getLogger(__name__)
+
+# Lo fija main.construir_app desde config.METRICAS_ACTIVAS; con False observar() no hace nada
+ACTIVAS = True
+
+# Límites superiores de los buckets, en segundos (el último bucket es +Inf)
+LIMITES = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class Histograma:
+    __slots__ = ("cuentas", "suma", "n", "maximo")
+
+    def __init__(self):
+        self.cuentas = [0] * (len(LIMITES) + 1)
+        self.suma = 0.0
+        self.n = 0
+        self.maximo = 0.0
+
+    def observar(self, segundos: float):
+        self.cuentas[bisect.bisect_left(LIMITES, segundos)] += 1
+        self.suma += segundos
+        self.n += 1
+        if segundos > self.maximo:
+            self.maximo = segundos
+
+    def percentil(self, q: float) -> float:
+        """Límite superior del bucket donde cae el percentil q (cota, no valor exacto)."""
+        objetivo = q * self.n
+        acumulado = 0
+        for limite, cuenta in zip(LIMITES, self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return min(limite, self.maximo)
+        return self.maximo
+
+# nombre -> (ayuda, nombres de las etiquetas, {valores de las etiquetas: Histograma})
+_FAMILIAS = {
+    "kamada_handler_segundos": ("Duración de cada handler, por conversación y estado", ("handler", "estado"), {}),
+    "kamada_db_segundos": ("Ejecución de las funciones de database.py en db_async", ("funcion", "modo"), {}),
+    "kamada_db_espera_segundos": ("Espera en la cola de db_async antes de ejecutarse", ("modo",), {}),
+    "kamada_reporte_segundos": ("Generación de reportes: consulta y Excel, imágenes, exportación", ("etapa",), {}),
+    "kamada_telegram_api_segundos": ("Llamadas a la API de Telegram (sin la espera del limitador)", ("metodo",), {}),
+    "kamada_envios_espera_segundos": ("Espera en el limitador de envíos antes de llamar a la API", (), {}),
+}
+
+def histograma(nombre: str, etiquetas: tuple = ()) -> Histograma:
+    series = _FAMILIAS[nombre][2]
+    h = series.get(etiquetas)
+    if h is None:
+        h = series[etiquetas] = Histograma()
+    return h
+
+def observar(nombre: str, etiquetas: tuple, segundos: float):
+    if ACTIVAS:
+        histograma(nombre, etiquetas).observar(segundos)
+
+def reiniciar():
+    for _, _, series in _FAMILIAS.values():
+        series.clear()
+
+# --- handlers ---
+def _nombres_estados(modulo: str):
+    """{valor: nombre} de las constantes de estado (ESPERANDO_*, CONFIRMAR) del módulo del handler."""
+    variables = vars(sys.modules[modulo]) if modulo in sys.modules else {}
+    return {v: k for k, v in variables.items()
+            if isinstance(v, int) and (k.startswith("ESPERANDO_") or k == "CONFIRMAR")}
+
+def _medido(callback, h: Histograma):
+    @functools.wraps(callback)
+    async def medido(update, context):
+        t0 = time.perf_counter()
+        try:
+            return await callback(update, context)
+        finally:
+            h.observar(time.perf_counter() - t0)
+    return medido
+
+def instrumentar(app):
+    """Envuelve el callback de cada handler del Application para medir su duración."""
+    for handlers in app.handlers.values():
+        for handler in handlers:
+            if isinstance(handler, ConversationHandler):
+                nombre = handler.name or "conversacion"
+                for h in handler.entry_points:
+                    h.callback = _medido(h.callback, histograma("kamada_handler_segundos", (nombre, "entrada")))
+                for h in handler.fallbacks:
+                    h.callback = _medido(h.callback, histograma("kamada_handler_segundos", (nombre, "fallback")))
+                for estado, hs in handler.states.items():
+                    for h in hs:
+                        estados = _nombres_estados(h.callback.__module__)
+                        etiquetas = (nombre, estados.get(estado, str(estado)))
+                        h.callback = _medido(h.callback, histograma("kamada_handler_segundos", etiquetas))
+            else:
+                etiquetas = (handler.callback.__name__, "-")
+                handler.callback = _medido(handler.callback, histograma("kamada_handler_segundos", etiquetas))
+
+# --- salida ---
+def _ms(segundos: float) -> str:
+    return f"{segundos * 1000:.1f}" if segundos < 10 else f"{segundos * 1000:.0f}"
+
+def resumen(max_por_familia: int = 12) -> str:
+    """Texto para /stats: por familia, las series con más tiempo acumulado (n, p50, p95, máximo en ms)."""
+    lineas = []
+    for nombre, (ayuda, _, series) in _FAMILIAS.items():
+        if not series:
+            continue
+        lineas.append(f"\n📈 {ayuda}")
+        ordenadas = sorted(series.items(), key=lambda s: s[1].suma, reverse=True)
+        for etiquetas, h in ordenadas[:max_por_familia]:
+            lineas.append(f"{'/'.join(etiquetas) or 'total'}: n={h.n} p50≤{_ms(h.percentil(0.5))} "
+                          f"p95≤{_ms(h.percentil(0.95))} máx {_ms(h.maximo)} ms")
+        if len(ordenadas) > max_por_familia:
+            lineas.append(f"… y {len(ordenadas) - max_por_familia} más")
+    if not lineas:
+        return "Todavía no hay mediciones." if ACTIVAS else "Las métricas están desactivadas (METRICAS_ACTIVAS=0)."
+    texto = "\n".join(lineas).strip()
+    # Límite de Telegram por mensaje
+    return texto if len(texto) <= 4000 else texto[:3990] + "\n…"
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _etiquetas(nombres, valores, le: str = None):
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if le is not None:
+        partes.append(f'le="{le}"')
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+def texto_prometheus() -> str:
+    """Todas las series en el formato de exposición de Prometheus."""
+    lineas = []
+    for nombre, (ayuda, nombres, series) in _FAMILIAS.items():
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} histogram")
+        for valores, h in sorted(series.items()):
+            acumulado = 0
+            for limite, cuenta in zip(LIMITES + (math.inf,), h.cuentas):
+                acumulado += cuenta
+                le = "+Inf" if limite == math.inf else repr(limite)
+                lineas.append(f"{nombre}_bucket{_etiquetas(nombres, valores, le)} {acumulado}")
+            lineas.append(f"{nombre}_sum{_etiquetas(nombres, valores)} {h.suma!r}")
+            lineas.append(f"{nombre}_count{_etiquetas(nombres, valores)} {h.n}")
+    return "\n".join(lineas) + "\n"
+
+def _escribir_archivo(ruta: str, texto: str):
+    # node_exporter puede leer en cualquier momento: se escribe aparte y se reemplaza de una vez
+    # (el textfile collector ignora los archivos que no terminan en .prom, como el temporal)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(tmp, ruta)
+
+async def escribir_archivo(ruta: str):
+    # El texto se arma en el event loop, donde se registran las mediciones; sólo la escritura va a un hilo
+    try:
+        await asyncio.to_thread(_escribir_archivo, ruta, texto_prometheus())
+    except OSError:
+        logger.exception("No se pudo escribir el archivo de métricas %s", ruta)
+
+_exportacion = None
+
+async def _exportar(ruta: str, intervalo: float):
+    while True:
+        await asyncio.sleep(intervalo)
+        await escribir_archivo(ruta)
+
+def iniciar_exportacion(ruta: str, intervalo: float):
+    """Escribe las métricas en 'ruta' cada 'intervalo' segundos (llamar con el event loop en marcha)."""
+    global _exportacion
+    _exportacion = asyncio.get_running_loop().create_task(_exportar(ruta, intervalo))
+
+async def detener_exportacion(ruta: str):
+    """Detiene la escritura periódica y deja el archivo con los últimos valores."""
+    global _exportacion
+    if _exportacion is not None:
+        _exportacion.cancel()
+        _exportacion = None
+    await escribir_archivo(ruta)
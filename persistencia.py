@@ -0,0 +1,126 @@
+# persistencia.py
+# Persistencia del Application en SQLite: estados de los ConversationHandler, user_data y chat_data.
+# Así una carga a medias (sardina, línea, …) se retoma después de un reinicio.
+#
+# PTB llama a update_* una vez cada update_interval segundos con lo que cambió en ese intervalo.
+# Aquí esas llamadas sólo dejan los cambios pendientes en memoria (descartando los que no cambiaron
+# respecto de lo ya guardado) y se escriben todos juntos en una transacción, en el hilo escritor de
+# db_async para no frenar el event loop. Procesar un mensaje no escribe nada en disco.
+import asyncio
+import json
+import logging
+import pickle
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+import db_async
+
+logger = logging.getLogger(__name__)
+
+class PersistenciaSQLite(BasePersistence):
+    def __init__(self, update_interval: float = 60):
+        # bot_data y callback_data no se usan en el bot
+        super().__init__(store_data=PersistenceInput(bot_data=False, callback_data=False),
+                         update_interval=update_interval)
+        self._sesiones = {}        # (tipo, id) -> datos serializados o None (borrar), pendientes
+        self._conversaciones = {}  # (nombre, clave) -> estado serializado o None (borrar), pendientes
+        self._guardado = {}        # última versión escrita/leída de cada fila, para no reescribir lo igual
+        self._escritura = None
+
+    # --- carga al arrancar ---
+    async def _leer_sesiones(self, tipo: str):
+        datos = {}
+        for id_, blob in await db_async.leer_sesiones(tipo):
+            self._guardado[("s", tipo, id_)] = blob
+            datos[id_] = pickle.loads(blob)
+        return datos
+
+    async def get_user_data(self):
+        return await self._leer_sesiones("user")
+
+    async def get_chat_data(self):
+        return await self._leer_sesiones("chat")
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str):
+        conversaciones = {}
+        for clave, blob in await db_async.leer_conversaciones(name):
+            self._guardado[("c", name, clave)] = blob
+            conversaciones[tuple(json.loads(clave))] = pickle.loads(blob)
+        return conversaciones
+
+    # --- cambios: quedan pendientes hasta la próxima escritura ---
+    def _marcar(self, pendientes, tipo: str, fila, valor):
+        blob = None if valor is None else pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        if self._guardado.get((tipo, *fila)) == blob and fila not in pendientes:
+            return  # sin cambios respecto de la base
+        pendientes[fila] = blob
+        if self._escritura is None or self._escritura.done():
+            self._escritura = asyncio.get_running_loop().create_task(self._escribir_ciclo())
+
+    async def update_user_data(self, user_id: int, data):
+        self._marcar(self._sesiones, "s", ("user", user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data):
+        self._marcar(self._sesiones, "s", ("chat", chat_id), data)
+
+    async def drop_user_data(self, user_id: int):
+        self._marcar(self._sesiones, "s", ("user", user_id), None)
+
+    async def drop_chat_data(self, chat_id: int):
+        self._marcar(self._sesiones, "s", ("chat", chat_id), None)
+
+    async def update_conversation(self, name: str, key, new_state):
+        self._marcar(self._conversaciones, "c", (name, json.dumps(list(key))), new_state)
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data):
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    # --- escritura ---
+    async def _escribir(self):
+        while self._sesiones or self._conversaciones:
+            sesiones, self._sesiones = self._sesiones, {}
+            conversaciones, self._conversaciones = self._conversaciones, {}
+            try:
+                await db_async.guardar_persistencia(sesiones, conversaciones)
+            except Exception:
+                # Quedan pendientes para la próxima escritura, sin pisar cambios más nuevos
+                sesiones.update(self._sesiones)
+                conversaciones.update(self._conversaciones)
+                self._sesiones, self._conversaciones = sesiones, conversaciones
+                raise
+            for fila, blob in sesiones.items():
+                self._guardado[("s", *fila)] = blob
+            for fila, blob in conversaciones.items():
+                self._guardado[("c", *fila)] = blob
+
+    async def _escribir_ciclo(self):
+        # Cede el turno una vez: las demás update_* del mismo ciclo se suman a esta transacción
+        await asyncio.sleep(0)
+        try:
+            await self._escribir()
+        except Exception:
+            logger.exception("No se pudo guardar la persistencia; queda pendiente para la próxima escritura")
+
+    async def flush(self):
+        """Lo llama PTB al detener el bot: escribe todo lo pendiente."""
+        if self._escritura is not None:
+            await self._escritura
+        await self._escribir()
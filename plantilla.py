@@ -0,0 +1,47 @@
+# plantilla.py
+# Índice en memoria de los trabajadores (id -> nombre) para validar los IDs que se cargan en
+# producción y mostrar los nombres en los resúmenes sin consultar la base en cada mensaje.
+# Se carga una vez y se recarga cuando la carga de trabajadores (recibir_excel) guarda cambios.
+import db_async
+from database import listar_trabajadores
+
+_nombres = None
+
+def _indice():
+    global _nombres
+    if _nombres is None:
+        _nombres = dict(listar_trabajadores())
+    return _nombres
+
+def cargar():
+    """Carga el índice de antemano (al arrancar), para que el primer mensaje no espere la consulta."""
+    _indice()
+
+async def recargar():
+    """Vuelve a leer los trabajadores desde un hilo de lectura, sin bloquear el event loop."""
+    global _nombres
+    _nombres = dict(await db_async.listar_trabajadores())
+
+def ids_registrados():
+    """IDs de todos los trabajadores registrados (para validar columnas enteras con isin)."""
+    return _indice().keys()
+
+def separar_ids(ids):
+    """Devuelve ([(id, nombre)] de los registrados, [ids] no registrados), en el orden recibido."""
+    nombres = _indice()
+    conocidos, desconocidos = [], []
+    for trabajador_id in ids:
+        nombre_trabajador = nombres.get(trabajador_id)
+        if nombre_trabajador is None:
+            desconocidos.append(trabajador_id)
+        else:
+            conocidos.append((trabajador_id, nombre_trabajador))
+    return conocidos, desconocidos
+
+def describir_ids(ids) -> str:
+    """Texto para los resúmenes de confirmación: '12 Ana Pérez, 34 Luis Gómez' y aviso de los no registrados."""
+    conocidos, desconocidos = separar_ids(ids)
+    texto = ", ".join(f"{i} {n}" for i, n in conocidos) or "—"
+    if desconocidos:
+        texto += f"\n⚠️ IDs no registrados: {', '.join(map(str, desconocidos))} (use ✏️ Editar para corregirlos)"
+    return texto
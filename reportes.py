@@ -0,0 +1,270 @@
+# reportes.py
+# Generación de reportes (consulta + Excel + imagen) fuera del event loop del bot.
+# Los reportes agregados se generan en memoria (BytesIO); las exportaciones de detalle, que
+# pueden ser muy grandes, se escriben en streaming a un archivo temporal (fuera del directorio de trabajo).
+# openpyxl y matplotlib se importan dentro de las funciones: el bot arranca sin cargarlos y sólo
+# los procesos que generan reportes pagan su importación.
+import asyncio
+import csv
+import gzip
+import io
+import itertools
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import cache_reportes
+import database
+import metricas
+from config import (
+    REPORTES_MAX_CONCURRENTES, REPORTES_TIMEOUT_SEG, REPORTES_FILAS_POR_PAGINA, REPORTES_MAX_PAGINAS
+)
+from database import (
+    iterar_registros_periodo, obtener_version_datos, obtener_totales_por_area, obtener_totales_por_trabajador
+)
+
+COLUMNAS = ["Fecha", "Area", "Empresa", "Tipo", "Cantidad", "Trabajador ID", "Nombre"]
+COLUMNAS_RESUMEN = ["Area", "Empresa", "Tipo", "Cantidad", "Registros"]
+COLUMNAS_TRABAJADOR = ["Trabajador ID", "Nombre", "Area", "Cantidad", "Registros"]
+
+def _renderizar_tabla(filas, columnas, titulo: str = None) -> bytes:
+    """Dibuja la tabla con la API orientada a objetos de Agg y devuelve el JPG."""
+    # Se importa el backend Agg directamente: no se carga pyplot ni se prueban backends gráficos.
+    # Figure + FigureCanvasAgg no registran la figura en pyplot, así que no queda
+    # referenciada globalmente y se libera al salir de la función.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, max(2, len(filas)*0.3)))
+    FigureCanvasAgg(fig)
+    try:
+        ax = fig.add_subplot()
+        ax.axis('off')
+        if titulo:
+            ax.set_title(titulo, fontsize=9)
+        tabla = ax.table(cellText=[list(f) for f in filas], colLabels=columnas, cellLoc='left', loc='center')
+        tabla.auto_set_font_size(False)
+        tabla.set_fontsize(8)
+        tabla.scale(1, 1.2)
+        buf = io.BytesIO()
+        fig.savefig(buf, format='jpg', bbox_inches='tight')
+        return buf.getvalue()
+    finally:
+        fig.clear()
+
+def paginar(rows):
+    """Divide las filas en páginas de REPORTES_FILAS_POR_PAGINA.
+
+    Devuelve [] si harían falta más de REPORTES_MAX_PAGINAS: en ese caso se envía sólo el Excel.
+    """
+    paginas = [rows[i:i + REPORTES_FILAS_POR_PAGINA] for i in range(0, len(rows), REPORTES_FILAS_POR_PAGINA)]
+    return paginas if len(paginas) <= REPORTES_MAX_PAGINAS else []
+
+def _agregar_hoja(wb, nombre: str, columnas, filas):
+    hoja = wb.create_sheet(nombre)
+    hoja.append(columnas)
+    for fila in filas:
+        hoja.append(fila)
+
+def _excel(resumen, por_trabajador) -> bytes:
+    """Excel con la hoja de resumen y la de totales por trabajador."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    _agregar_hoja(wb, "Resumen", COLUMNAS_RESUMEN, resumen)
+    _agregar_hoja(wb, "Por trabajador", COLUMNAS_TRABAJADOR, por_trabajador)
+    excel = io.BytesIO()
+    wb.save(excel)
+    return excel.getvalue()
+
+def construir_reporte(resumen, por_trabajador=()):
+    """Devuelve (excel_bytes, [jpg_bytes por página]) generando todo en el proceso actual."""
+    paginas = paginar(resumen)
+    return (_excel(resumen, por_trabajador),
+            [renderizar_pagina(p, i + 1, len(paginas)) for i, p in enumerate(paginas)])
+
+# Estas funciones corren en los procesos del pool: deben ser de nivel de módulo (picklables).
+def preparar_reporte(tipo: str, inicio: str, fin: str, empresa: str = None):
+    """Consulta y arma el Excel. Devuelve (clave_cache, excel_bytes, páginas) o None si no hay registros."""
+    # La versión se lee antes de consultar: si los datos cambian mientras se genera,
+    # la entrada queda con la versión vieja y la próxima petición la regenera.
+    clave = cache_reportes.clave(tipo, inicio, fin, empresa, obtener_version_datos())
+    resumen = obtener_totales_por_area(inicio, fin, empresa)
+    if not resumen:
+        return None
+    por_trabajador = obtener_totales_por_trabajador(inicio, fin, empresa)
+    # La imagen muestra sólo el resumen, que es pequeño a cualquier volumen de datos
+    return clave, _excel(resumen, por_trabajador), paginar(resumen)
+
+def renderizar_pagina(filas, pagina: int, total: int) -> bytes:
+    titulo = f"Página {pagina}/{total}" if total > 1 else None
+    return _renderizar_tabla(filas, COLUMNAS_RESUMEN, titulo)
+
+def escribir_detalle(inicio: str, fin: str, empresa: str = None, formato: str = "xlsx"):
+    """Exporta cada registro del periodo a un archivo temporal sin cargarlos todos en memoria.
+
+    formato "xlsx": libro write-only de openpyxl con Resumen, Por trabajador y Detalle.
+    formato "csv": sólo el detalle, CSV comprimido con gzip (más rápido y liviano).
+    Devuelve la ruta del archivo (quien la recibe debe borrarla) o None si no hay registros.
+    """
+    filas = iterar_registros_periodo(inicio, fin, empresa)
+    primera = next(filas, None)
+    if primera is None:
+        return None
+    fd, ruta = tempfile.mkstemp(prefix="kamada_", suffix=".csv.gz" if formato == "csv" else ".xlsx")
+    os.close(fd)
+    try:
+        if formato == "csv":
+            with gzip.open(ruta, "wt", newline="", encoding="utf-8", compresslevel=6) as f:
+                escritor = csv.writer(f)
+                escritor.writerow(COLUMNAS)
+                escritor.writerow(primera)
+                escritor.writerows(filas)
+        else:
+            from openpyxl import Workbook
+
+            # write_only: las filas se vuelcan al archivo a medida que se agregan
+            wb = Workbook(write_only=True)
+            _agregar_hoja(wb, "Resumen", COLUMNAS_RESUMEN, obtener_totales_por_area(inicio, fin, empresa))
+            _agregar_hoja(wb, "Por trabajador", COLUMNAS_TRABAJADOR, obtener_totales_por_trabajador(inicio, fin, empresa))
+            # COLUMNAS CORREGIDAS: Incluye 'Trabajador ID' y excluye 'ResponsableID'
+            _agregar_hoja(wb, "Detalle", COLUMNAS, itertools.chain((primera,), filas))
+            wb.save(ruta)
+    except BaseException:
+        os.remove(ruta)
+        raise
+    finally:
+        filas.close()  # devuelve la conexión de lectura al pool aunque no se haya consumido todo
+    return ruta
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_cupos = None
+
+def _iniciar_proceso(db_name: str):
+    # Con forkserver/spawn el proceso no hereda los cambios hechos en memoria, como DB_NAME
+    database.DB_NAME = db_name
+
+def _pool():
+    """Pool de procesos de reportes; se crea al pedir el primer reporte (o tras descartar uno colgado)."""
+    global _executor
+    if _executor is None:
+        # Nunca fork: el bot ya tiene los hilos de db_async con sus conexiones SQLite y un hijo
+        # copiado a mitad de un lock se bloquearía para siempre. forkserver arranca los procesos desde
+        # un servidor limpio que sólo importó este módulo (Windows sólo tiene spawn).
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            contexto = multiprocessing.get_context("forkserver")
+            contexto.set_forkserver_preload([__name__])
+        else:
+            contexto = multiprocessing.get_context("spawn")
+        _executor = ProcessPoolExecutor(max_workers=REPORTES_MAX_CONCURRENTES, mp_context=contexto,
+                                        initializer=_iniciar_proceso,
+                                        initargs=(os.path.abspath(database.DB_NAME),))
+    return _executor
+
+def _descartar_pool(executor):
+    """Termina los procesos de un pool colgado o roto; el próximo reporte arranca uno nuevo.
+
+    Los reportes que aún corrían en él fallan con BrokenProcessPool.
+    """
+    global _executor
+    if _executor is executor:
+        _executor = None
+    procesos = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for proceso in procesos:
+        proceso.terminate()
+
+def hay_cola() -> bool:
+    """True si todos los cupos están ocupados y un nuevo reporte tendrá que esperar."""
+    return _cupos is not None and _cupos.locked()
+
+async def _en_pool(trabajos, fn, *args):
+    inicio = time.perf_counter()
+    cf = _pool().submit(fn, *args)
+    trabajos.append(cf)
+    resultado = await asyncio.wrap_future(cf)
+    # preparar_reporte (consulta y Excel), renderizar_pagina (imagen) o escribir_detalle (exportación)
+    metricas.observar("kamada_reporte_segundos", (fn.__name__,), time.perf_counter() - inicio)
+    return resultado
+
+async def _generar(trabajos, tipo, inicio, fin, empresa):
+    preparado = await _en_pool(trabajos, preparar_reporte, tipo, inicio, fin, empresa)
+    if preparado is None:
+        return None
+    clave, excel, paginas = preparado
+    # Cada página se dibuja en su propio proceso del pool, en paralelo
+    imagenes = list(await asyncio.gather(*(
+        _en_pool(trabajos, renderizar_pagina, filas, i + 1, len(paginas))
+        for i, filas in enumerate(paginas)
+    )))
+    await asyncio.to_thread(cache_reportes.guardar, clave, excel, imagenes)
+    return excel, imagenes
+
+def _liberar_cupo(cupos, trabajos):
+    # Los trabajos que aún no empezaron se quitan de la cola. El cupo se libera cuando los que ya
+    # estaban corriendo terminan de verdad (aunque el usuario ya haya recibido el timeout); así el
+    # tope de procesos se respeta siempre.
+    corriendo = [cf for cf in trabajos if not cf.cancel() and not cf.done()]
+    if not corriendo:
+        cupos.release()
+        return
+    loop = asyncio.get_running_loop()
+    restantes = [len(corriendo)]
+
+    def uno_menos():
+        restantes[0] -= 1
+        if restantes[0] == 0:
+            cupos.release()
+    for cf in corriendo:
+        cf.add_done_callback(lambda _: loop.call_soon_threadsafe(uno_menos))
+
+async def _con_cupo(trabajo):
+    """Ejecuta trabajo(trabajos) ocupando un cupo del pool y con el timeout de reportes.
+
+    Como máximo se generan REPORTES_MAX_CONCURRENTES reportes a la vez; los demás esperan su turno.
+    Lanza asyncio.TimeoutError si el reporte supera REPORTES_TIMEOUT_SEG o si su proceso murió.
+    """
+    global _cupos
+    if _cupos is None:
+        _cupos = asyncio.Semaphore(REPORTES_MAX_CONCURRENTES)
+
+    cupos = _cupos
+    inicio = time.perf_counter()
+    await cupos.acquire()
+    metricas.observar("kamada_reporte_segundos", ("espera_cupo",), time.perf_counter() - inicio)
+    executor = _pool()
+    trabajos = []
+    try:
+        return await asyncio.wait_for(trabajo(trabajos), REPORTES_TIMEOUT_SEG)
+    except (asyncio.TimeoutError, BrokenProcessPool) as e:
+        # wait_for sólo deja de esperar: un proceso colgado seguiría ocupando el cupo para siempre.
+        # Se termina el pool entero (ProcessPoolExecutor no mata procesos sueltos) y el cupo se
+        # libera ya; un pool roto (proceso muerto) tampoco se recupera solo.
+        logger.warning("Reporte cancelado (%s); se reinicia el pool de reportes", type(e).__name__)
+        _descartar_pool(executor)
+        trabajos.clear()
+        raise asyncio.TimeoutError from e
+    finally:
+        _liberar_cupo(cupos, trabajos)
+
+async def generar_reporte(tipo: str, inicio: str, fin: str, empresa: str = None):
+    """Genera el reporte agregado en el pool de procesos. Devuelve (excel_bytes, [jpg_bytes]) o None."""
+    return await _con_cupo(lambda trabajos: _generar(trabajos, tipo, inicio, fin, empresa))
+
+async def exportar_detalle(inicio: str, fin: str, empresa: str = None, formato: str = "xlsx"):
+    """Exporta los registros individuales en el pool de procesos. Devuelve la ruta temporal o None."""
+    return await _con_cupo(lambda trabajos: _en_pool(trabajos, escribir_detalle, inicio, fin, empresa, formato))
+
+def cerrar_pool_reportes():
+    """Detiene los procesos de reportes (llamar al apagar el bot)."""
+    global _executor, _cupos
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    _cupos = None